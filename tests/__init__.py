@@ -0,0 +1,14 @@
+import os
+
+
+XML_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'xml')
+
+
+def read_xml(*path):
+
+    """
+    Read an XML template from the tests/xml directory.
+    """
+
+    with open(os.path.join(XML_DIRECTORY, *path), 'rb') as xml_file:
+        return xml_file.read()
@@ -0,0 +1,168 @@
+import datetime
+import decimal
+import unittest
+
+from upnpy.soap import DataTypes
+from upnpy.ssdp.SSDPDevice import SSDPDevice
+from upnpy import exceptions
+
+
+def get_state_variable(data_type, allowed_value_list=None, allowed_value_range=None):
+    return SSDPDevice.Service.StateVariable('Variable', data_type, allowed_value_list or [], allowed_value_range)
+
+
+def get_serializer(data_type, allowed_value_list=None, allowed_value_range=None):
+    return DataTypes.compile_serializer(
+        'NewValue', get_state_variable(data_type, allowed_value_list, allowed_value_range)
+    )
+
+
+def get_converter(data_type):
+    return DataTypes.compile_converter(get_state_variable(data_type))
+
+
+class TestSerializers(unittest.TestCase):
+
+    def assertInvalid(self, serialize, *values):
+        for value in values:
+            with self.assertRaises(exceptions.ArgumentError, msg=repr(value)):
+                serialize(value)
+
+    def test_integer(self):
+        serialize = get_serializer('ui2')
+
+        self.assertEqual(serialize(8080), '8080')
+        self.assertEqual(serialize('8080'), '8080')
+        self.assertEqual(serialize(2.0), '2')
+        self.assertInvalid(serialize, -1, 65536, 1.9, decimal.Decimal('1.5'), float('inf'), True, 'port', None)
+
+    def test_integer_ranges(self):
+        self.assertEqual(get_serializer('i1')(-128), '-128')
+        self.assertInvalid(get_serializer('i1'), -129, 128)
+        self.assertEqual(get_serializer('ui8')(2 ** 64 - 1), str(2 ** 64 - 1))
+
+    def test_integer_allowed_value_range(self):
+        serialize = get_serializer('ui2', allowed_value_range={'minimum': '10', 'maximum': '100', 'step': '5'})
+
+        self.assertEqual(serialize(10), '10')
+        self.assertEqual(serialize(95), '95')
+        self.assertInvalid(serialize, 5, 105, 12)
+
+    def test_float(self):
+        serialize = get_serializer('r8')
+
+        self.assertEqual(serialize(1.5), '1.5')
+        self.assertEqual(serialize(' 1.5 '), '1.5')
+        self.assertEqual(serialize(decimal.Decimal('0.25')), '0.25')
+        self.assertInvalid(serialize, True, 'nan', 'inf', float('nan'), float('-inf'), 'number', None, 10 ** 400)
+
+    def test_float_allowed_value_range(self):
+        serialize = get_serializer('number', allowed_value_range={'minimum': '0', 'maximum': '1'})
+
+        self.assertEqual(serialize(0.5), '0.5')
+        self.assertInvalid(serialize, -0.1, 1.1)
+
+    def test_boolean(self):
+        serialize = get_serializer('boolean')
+
+        for value in (True, 1, '1', 'true', 'Yes'):
+            self.assertEqual(serialize(value), '1')
+        for value in (False, 0, '0', 'false', 'NO'):
+            self.assertEqual(serialize(value), '0')
+        self.assertInvalid(serialize, 2, 'on', None)
+
+    def test_allowed_value_list(self):
+        serialize = get_serializer('string', allowed_value_list=['TCP', 'UDP'])
+
+        self.assertEqual(serialize('UDP'), 'UDP')
+        self.assertInvalid(serialize, 'udp', 'ICMP')
+
+    def test_string(self):
+        self.assertEqual(get_serializer('string')('<a & b>'), '&lt;a &amp; b&gt;')
+        self.assertEqual(get_serializer('string')(42), '42')
+
+    def test_unknown_state_variable(self):
+        self.assertEqual(DataTypes.compile_serializer('NewValue', None)('a & b'), 'a &amp; b')
+
+
+class TestConverters(unittest.TestCase):
+
+    def test_numbers(self):
+        self.assertEqual(get_converter('ui4')('1234'), 1234)
+        self.assertEqual(get_converter('i4')('-5'), -5)
+        self.assertEqual(get_converter('r8')('1.5'), 1.5)
+
+    def test_boolean(self):
+        self.assertIs(get_converter('boolean')('1'), True)
+        self.assertIs(get_converter('boolean')(' true '), True)
+        self.assertIs(get_converter('boolean')('no'), False)
+
+    def test_date_and_time(self):
+        self.assertEqual(get_converter('date')('2020-01-31'), datetime.date(2020, 1, 31))
+        self.assertEqual(get_converter('time')('13:45:10'), datetime.time(13, 45, 10))
+        self.assertEqual(
+            get_converter('dateTime')('2020-01-31T13:45:10.5'), datetime.datetime(2020, 1, 31, 13, 45, 10, 500000)
+        )
+        self.assertEqual(
+            get_converter('dateTime.tz')('2020-01-31T13:45:10+02:00'),
+            datetime.datetime(2020, 1, 31, 13, 45, 10, tzinfo=datetime.timezone(datetime.timedelta(hours=2)))
+        )
+        self.assertEqual(
+            get_converter('time.tz')('13:45:10Z'), datetime.time(13, 45, 10, tzinfo=datetime.timezone.utc)
+        )
+
+    def test_binary(self):
+        self.assertEqual(get_converter('bin.base64')('dXBucHk='), b'upnpy')
+        self.assertEqual(get_converter('bin.hex')('7570'), b'up')
+
+    def test_empty_values(self):
+        for data_type in ('ui4', 'r8', 'boolean', 'dateTime', 'bin.base64'):
+            self.assertIsNone(get_converter(data_type)(''))
+
+    def test_invalid_values_are_returned_as_text(self):
+        self.assertEqual(get_converter('ui4')('unknown'), 'unknown')
+        self.assertEqual(get_converter('boolean')('maybe'), 'maybe')
+        self.assertEqual(get_converter('dateTime')('yesterday'), 'yesterday')
+        self.assertEqual(get_converter('bin.base64')('not base64!'), 'not base64!')
+
+    def test_other_types(self):
+        self.assertEqual(get_converter('string')('1234'), '1234')
+        self.assertEqual(DataTypes.compile_converter(None)('1234'), '1234')
+
+
+class TestResultConverter(unittest.TestCase):
+
+    def setUp(self):
+        self.arguments = [
+            SSDPDevice.Service.Action.Argument('NewUptime', 'out', None, 'Uptime'),
+            SSDPDevice.Service.Action.Argument('NewConnectionStatus', 'out', None, 'ConnectionStatus'),
+            SSDPDevice.Service.Action.Argument('New-Value', 'out', None, None)
+        ]
+        self.state_variables = {
+            'Uptime': get_state_variable('ui4'),
+            'ConnectionStatus': get_state_variable('string')
+        }
+
+    def test_named_tuple(self):
+        convert = DataTypes.compile_result_converter('GetStatusInfo', self.arguments, self.state_variables)
+        result = convert({'NewUptime': '1234', 'NewConnectionStatus': 'Connected', 'New-Value': 'x'})
+
+        self.assertEqual(type(result).__name__, 'GetStatusInfoResult')
+        self.assertEqual(result.NewUptime, 1234)
+        self.assertEqual(result.NewConnectionStatus, 'Connected')
+        self.assertEqual(result[2], 'x')
+
+    def test_missing_arguments(self):
+        convert = DataTypes.compile_result_converter('GetStatusInfo', self.arguments, self.state_variables)
+        self.assertEqual(tuple(convert({'NewUptime': '1'})), (1, None, None))
+
+    def test_vendor_action_names(self):
+        convert = DataTypes.compile_result_converter('X_AVM-DE_GetInfo', self.arguments, self.state_variables)
+        self.assertEqual(type(convert({})).__name__, 'X_AVM_DE_GetInfoResult')
+
+        convert = DataTypes.compile_result_converter('1Action', self.arguments, self.state_variables)
+        self.assertEqual(type(convert({})).__name__, '_1ActionResult')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,180 @@
+import unittest
+
+from upnpy.ssdp.SSDPDevice import SSDPDevice
+from upnpy.upnp.DeviceRegistry import DeviceRegistry
+from tests import read_xml
+
+
+def get_device(udn='uuid:1', host='192.168.1.1', boot_id=None, usn=True, max_age=1800):
+    response = f'HTTP/1.1 200 OK\r\nCACHE-CONTROL: max-age={max_age}\r\n' \
+               f'LOCATION: http://{host}:5431/desc.xml\r\nST: upnp:rootdevice\r\n'
+    if usn:
+        response += f'USN: {udn}::upnp:rootdevice\r\n'
+    if boot_id is not None:
+        response += f'BOOTID.UPNP.ORG: {boot_id}\r\n'
+
+    # The description is provided so that nothing is requested from the device
+    return SSDPDevice(
+        (host, 1900), response + '\r\n', lazy=True, description=read_xml('device_templates', 'TestDevice.xml')
+    )
+
+
+class TestDeviceRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = DeviceRegistry()
+
+    def test_add(self):
+        device = get_device()
+        self.registry.add(device)
+
+        self.assertIs(self.registry.get('uuid:1::upnp:rootdevice'), device)
+        self.assertIn('uuid:1::upnp:rootdevice', self.registry)
+        self.assertEqual(self.registry.get_devices(), [device])
+        self.assertEqual(len(self.registry), 1)
+
+    def test_add_replaces_device_with_same_usn(self):
+        self.registry.add(get_device())
+        device = get_device()
+        self.registry.add(device)
+
+        self.assertEqual(self.registry.get_devices(), [device])
+
+    def test_device_without_usn_is_registered_by_location(self):
+        device = get_device(usn=False)
+        self.registry.add(device)
+
+        self.assertIs(self.registry.get('http://192.168.1.1:5431/desc.xml'), device)
+        self.assertEqual(self.registry.find(device_type='InternetGatewayDevice'), [device])
+
+    def test_remove(self):
+        device = get_device()
+        self.registry.add(device)
+
+        self.assertIs(self.registry.remove('uuid:1::upnp:rootdevice'), device)
+        self.assertIsNone(self.registry.remove('uuid:1::upnp:rootdevice'))
+        self.assertEqual(len(self.registry), 0)
+        self.assertEqual(self.registry.find(host='192.168.1.1'), [])
+
+    def test_expiry(self):
+        self.registry.add(get_device('uuid:1'), max_age=-1)
+        self.registry.add(get_device('uuid:2', max_age=0))
+        device = get_device('uuid:3')
+        self.registry.add(device)
+
+        self.assertIsNone(self.registry.get('uuid:1::upnp:rootdevice'))
+        self.assertIsNone(self.registry.get('uuid:2::upnp:rootdevice'))
+        self.assertEqual(self.registry.get_devices(), [device])
+        self.assertEqual(self.registry.find(device_type='InternetGatewayDevice'), [device])
+
+    def test_refresh(self):
+        self.registry.add(get_device(), max_age=-1)
+        self.assertFalse(self.registry.refresh('uuid:1::upnp:rootdevice'))
+
+        self.registry.add(get_device(), max_age=60)
+        self.assertTrue(self.registry.refresh('uuid:1::upnp:rootdevice', max_age=-1))
+        self.assertNotIn('uuid:1::upnp:rootdevice', self.registry)
+
+    def test_least_recently_used_device_is_evicted(self):
+        registry = DeviceRegistry(max_size=2)
+        first_device, second_device, third_device = get_device('uuid:1'), get_device('uuid:2'), get_device('uuid:3')
+
+        registry.add(first_device)
+        registry.add(second_device)
+
+        # Looking up the first device makes the second one the least recently used
+        registry.get('uuid:1::upnp:rootdevice')
+        registry.add(third_device)
+
+        self.assertEqual(len(registry), 2)
+        self.assertIsNone(registry.get('uuid:2::upnp:rootdevice'))
+        self.assertIs(registry.get('uuid:1::upnp:rootdevice'), first_device)
+        self.assertIs(registry.get('uuid:3::upnp:rootdevice'), third_device)
+
+    def test_lookup(self):
+        device = get_device(boot_id='1')
+        self.registry.add(device)
+
+        self.assertIs(self.registry.lookup(get_device(boot_id='1').headers), device)
+        self.assertIsNone(self.registry.lookup(get_device(boot_id='2').headers))
+        self.assertIsNone(self.registry.lookup(get_device(host='192.168.1.2', boot_id='1').headers))
+        self.assertIsNone(self.registry.lookup(get_device('uuid:2', boot_id='1').headers))
+
+    def test_find(self):
+        first_device, second_device = get_device('uuid:1'), get_device('uuid:2', host='192.168.1.2')
+        self.registry.add(first_device)
+        self.registry.add(second_device)
+
+        self.assertEqual(self.registry.find(host='192.168.1.2'), [second_device])
+        self.assertEqual(self.registry.find(udn='uuid:1'), [first_device])
+        self.assertEqual(
+            self.registry.find(service_type='WANPPPConnection:1', friendly_name='TestCompany ADSL Router'),
+            [first_device, second_device]
+        )
+        self.assertEqual(self.registry.find(device_type='MediaServer'), [])
+        self.assertEqual(
+            [service.id for service in self.registry.find_services('WANPPPConnection', udn='uuid:1')],
+            ['urn:upnp-org:serviceId:WANPPPConnection.1']
+        )
+
+    def test_get_changes(self):
+        first_device, second_device = get_device('uuid:1', boot_id='1'), get_device('uuid:2')
+        self.registry.add(first_device)
+        self.registry.add(second_device)
+
+        self.assertEqual(self.registry.get_changes(), ([first_device, second_device], [], []))
+        self.assertEqual(self.registry.get_changes(), ([], [], []))
+
+        # Adding a device again with the same configuration isn't a change
+        self.registry.add(get_device('uuid:1', boot_id='1'))
+        self.assertEqual(self.registry.get_changes(), ([], [], []))
+
+        rebooted_device = get_device('uuid:1', boot_id='2')
+        self.registry.add(rebooted_device)
+        self.registry.remove('uuid:2::upnp:rootdevice')
+
+        self.assertEqual(self.registry.get_changes(), ([], [second_device], [rebooted_device]))
+
+    def test_get_changes_combines_changes(self):
+        device = get_device('uuid:1')
+        self.registry.add(get_device('uuid:2'))
+        self.registry.get_changes()
+
+        # Devices added and removed again in the meantime are left out
+        self.registry.add(device)
+        self.registry.remove('uuid:1::upnp:rootdevice')
+
+        # Devices removed and added again are reported as changed
+        self.registry.remove('uuid:2::upnp:rootdevice')
+        readded_device = get_device('uuid:2')
+        self.registry.add(readded_device)
+
+        self.assertEqual(self.registry.get_changes(), ([], [], [readded_device]))
+
+    def test_get_changes_reports_expired_and_evicted_devices(self):
+        registry = DeviceRegistry(max_size=1)
+        expired_device, evicted_device, device = get_device('uuid:1'), get_device('uuid:2'), get_device('uuid:3')
+
+        registry.add(expired_device, max_age=-1)
+        registry.add(evicted_device)
+        registry.get_changes()
+        registry.add(device)
+
+        self.assertEqual(registry.get_changes(), ([device], [evicted_device], []))
+
+        registry.add(expired_device, max_age=-1)
+        registry.get_changes()
+        self.assertEqual(registry.get_changes(), ([], [], []))
+
+    def test_clear(self):
+        device = get_device()
+        self.registry.add(device)
+        self.registry.get_changes()
+        self.registry.clear()
+
+        self.assertEqual(len(self.registry), 0)
+        self.assertEqual(self.registry.get_changes(), ([], [device], []))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+import io
+import unittest
+import urllib.error
+
+from upnpy.soap import SOAP
+from upnpy.ssdp.SSDPDevice import SSDPDevice
+from upnpy import exceptions
+from tests import read_xml
+
+
+SERVICE_TYPE = 'urn:schemas-upnp-org:service:WANPPPConnection:1'
+
+ENVELOPE_START = '<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/" ' \
+                 's:encodingStyle="http://schemas.xmlsoap.org/soap/encoding/"><s:Body>'
+ENVELOPE_END = '</s:Body></s:Envelope>'
+
+
+def get_schema():
+    return SSDPDevice.Service.Schema(SERVICE_TYPE, read_xml('service_templates', 'WANPPPConnection.1.xml').decode())
+
+
+def get_port_mapping(**arguments):
+    port_mapping = {
+        'NewRemoteHost': '',
+        'NewExternalPort': 8080,
+        'NewProtocol': 'TCP',
+        'NewInternalPort': 80,
+        'NewInternalClient': '192.168.1.2',
+        'NewEnabled': True,
+        'NewPortMappingDescription': 'Web server',
+        'NewLeaseDuration': 0
+    }
+    port_mapping.update(arguments)
+    return port_mapping
+
+
+def get_response(action_name, body):
+    return io.BytesIO(
+        f'<?xml version="1.0"?>{ENVELOPE_START}<u:{action_name}Response xmlns:u="{SERVICE_TYPE}">{body}'
+        f'</u:{action_name}Response>{ENVELOPE_END}'.encode()
+    )
+
+
+def get_http_error(code, body):
+    return urllib.error.HTTPError('http://192.168.1.1/control', code, 'Error', {}, io.BytesIO(body))
+
+
+class TestRequestTemplate(unittest.TestCase):
+
+    def setUp(self):
+        self.schema = get_schema()
+
+    def test_render(self):
+        request_template = self.schema.actions['AddPortMapping'].request_template
+
+        self.assertEqual(
+            request_template.render(get_port_mapping()).decode(),
+            f'{ENVELOPE_START}<u:AddPortMapping xmlns:u="{SERVICE_TYPE}"><NewRemoteHost></NewRemoteHost>'
+            '<NewExternalPort>8080</NewExternalPort><NewProtocol>TCP</NewProtocol>'
+            '<NewInternalPort>80</NewInternalPort><NewInternalClient>192.168.1.2</NewInternalClient>'
+            '<NewEnabled>1</NewEnabled><NewPortMappingDescription>Web server</NewPortMappingDescription>'
+            f'<NewLeaseDuration>0</NewLeaseDuration></u:AddPortMapping>{ENVELOPE_END}'
+        )
+
+    def test_render_without_arguments(self):
+        request_template = self.schema.actions['GetExternalIPAddress'].request_template
+
+        self.assertEqual(
+            request_template.render({}).decode(),
+            f'{ENVELOPE_START}<u:GetExternalIPAddress xmlns:u="{SERVICE_TYPE}"></u:GetExternalIPAddress>{ENVELOPE_END}'
+        )
+
+    def test_headers(self):
+        self.assertEqual(self.schema.actions['GetExternalIPAddress'].request_template.headers, {
+            'Content-Type': 'text/xml; charset="utf-8"',
+            'SOAPAction': f'"{SERVICE_TYPE}#GetExternalIPAddress"'
+        })
+
+    def test_values_are_escaped(self):
+        request_body = self.schema.actions['AddPortMapping'].request_template.render(
+            get_port_mapping(NewPortMappingDescription='<Caf\xe9 & "Bar">')
+        )
+
+        self.assertIn(
+            b'<NewPortMappingDescription>&lt;Caf&#233; &amp; "Bar"&gt;</NewPortMappingDescription>', request_body
+        )
+
+    def test_missing_arguments(self):
+        arguments = get_port_mapping()
+        del arguments['NewProtocol']
+        del arguments['NewLeaseDuration']
+
+        with self.assertRaises(exceptions.ArgumentError) as context:
+            self.schema.actions['AddPortMapping'].request_template.render(arguments)
+        self.assertEqual(context.exception.argument, ['NewProtocol', 'NewLeaseDuration'])
+
+    def test_unknown_argument(self):
+        with self.assertRaises(exceptions.ArgumentError) as context:
+            self.schema.actions['AddPortMapping'].request_template.render(get_port_mapping(NewPort=80))
+        self.assertEqual(context.exception.argument, 'NewPort')
+
+    def test_invalid_values(self):
+        request_template = self.schema.actions['AddPortMapping'].request_template
+
+        for argument, value in (('NewProtocol', 'ICMP'), ('NewExternalPort', 65536), ('NewEnabled', 'maybe')):
+            with self.assertRaises(exceptions.ArgumentError) as context:
+                request_template.render(get_port_mapping(**{argument: value}))
+            self.assertEqual(context.exception.argument, argument)
+
+
+class TestParseResponse(unittest.TestCase):
+
+    def test_out_arguments(self):
+        response = get_response(
+            'GetStatusInfo',
+            '<NewConnectionStatus>Connected</NewConnectionStatus><NewLastConnectionError>ERROR_NONE'
+            '</NewLastConnectionError><NewUptime>1234</NewUptime>'
+        )
+
+        self.assertEqual(SOAP._parse_response(response, 'GetStatusInfo'), {
+            'NewConnectionStatus': 'Connected',
+            'NewLastConnectionError': 'ERROR_NONE',
+            'NewUptime': '1234'
+        })
+
+    def test_empty_values(self):
+        response = get_response('GetExternalIPAddress', '<NewExternalIPAddress>\n  </NewExternalIPAddress>')
+
+        self.assertEqual(SOAP._parse_response(response, 'GetExternalIPAddress'), {'NewExternalIPAddress': ''})
+
+    def test_only_direct_children_are_out_arguments(self):
+        response = get_response(
+            'GetExternalIPAddress', '<NewExternalIPAddress><Nested>1.2.3.4</Nested></NewExternalIPAddress>'
+        )
+
+        self.assertEqual(SOAP._parse_response(response, 'GetExternalIPAddress'), {'NewExternalIPAddress': ''})
+
+    def test_missing_response_element(self):
+        with self.assertRaises(exceptions.SOAPError) as context:
+            SOAP._parse_response(get_response('GetStatusInfo', ''), 'GetExternalIPAddress')
+        self.assertIsNone(context.exception.error)
+
+    def test_malformed_response(self):
+        with self.assertRaises(exceptions.SOAPError) as context:
+            SOAP._parse_response(io.BytesIO(b'<s:Envelope><s:Body><u:GetExternalIPAddressResponse'),
+                                 'GetExternalIPAddress')
+        self.assertIsNone(context.exception.error)
+
+
+class TestGetSoapError(unittest.TestCase):
+
+    def test_fault(self):
+        error = SOAP._get_soap_error(get_http_error(500, (
+            f'<?xml version="1.0"?>{ENVELOPE_START}<s:Fault><faultcode>s:Client</faultcode>'
+            '<faultstring>UPnPError</faultstring><detail><UPnPError xmlns="urn:schemas-upnp-org:control-1-0">'
+            '<errorCode>718</errorCode><errorDescription>ConflictInMappingEntry</errorDescription></UPnPError>'
+            f'</detail></s:Fault>{ENVELOPE_END}'
+        ).encode()))
+
+        self.assertEqual((error.error, error.description), (718, 'ConflictInMappingEntry'))
+
+    def test_other_status_code(self):
+        error = SOAP._get_soap_error(get_http_error(404, b''))
+        self.assertEqual((error.error, error.description), (404, 'Unknown response code received.'))
+
+    def test_malformed_fault(self):
+        error = SOAP._get_soap_error(get_http_error(500, b'<s:Envelope><unclosed'))
+        self.assertEqual((error.error, error.description), (500, 'Unknown response code received.'))
+
+
+if __name__ == '__main__':
+    unittest.main()
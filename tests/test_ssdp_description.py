@@ -0,0 +1,104 @@
+import unittest
+
+from upnpy.ssdp import SSDPDescription
+from tests import read_xml
+
+
+class TestParseDeviceDescription(unittest.TestCase):
+
+    def setUp(self):
+        self.description = SSDPDescription.parse_device_description(
+            read_xml('device_templates', 'TestDevice.xml')
+        )
+
+    def test_root_device_details(self):
+        self.assertEqual(self.description['friendly_name'], 'TestCompany ADSL Router')
+        self.assertEqual(self.description['device_type'], 'urn:schemas-upnp-org:device:InternetGatewayDevice:1')
+        self.assertEqual(self.description['url_base'], 'http://192.168.1.1:5431/')
+
+    def test_services_of_embedded_devices(self):
+        self.assertEqual(self.description['services'], [
+            {
+                'service': 'urn:schemas-upnp-org:service:WANCommonInterfaceConfig:1',
+                'service_id': 'urn:upnp-org:serviceId:WANCommonInterfaceConfig.1',
+                'control_url': '/uuid:c8d12a3b-22a7-a722-3b2a-d1c8d13ba70001/WANCommonInterfaceConfig:1',
+                'event_sub_url': '/uuid:c8d12a3b-22a7-a722-3b2a-d1c8d13ba70001/WANCommonInterfaceConfig:1',
+                'scpd_url': '/dynsvc/WANCommonInterfaceConfig:1.xml'
+            },
+            {
+                'service': 'urn:schemas-upnp-org:service:WANPPPConnection:1',
+                'service_id': 'urn:upnp-org:serviceId:WANPPPConnection.1',
+                'control_url': '/uuid:c8d12a3b-22a7-a722-3b2a-d1c8d13ba70002/WANPPPConnection:1',
+                'event_sub_url': '/uuid:c8d12a3b-22a7-a722-3b2a-d1c8d13ba70002/WANPPPConnection:1',
+                'scpd_url': '/dynsvc/WANPPPConnection:1.xml'
+            }
+        ])
+
+    def test_text_description(self):
+        description = read_xml('device_templates', 'TestDevice.xml').decode()
+        self.assertEqual(SSDPDescription.parse_device_description(description), self.description)
+
+    def test_description_without_url_base(self):
+        description = SSDPDescription.parse_device_description(
+            '<root xmlns="urn:schemas-upnp-org:device-1-0"><device>'
+            '<deviceType>urn:schemas-upnp-org:device:MediaServer:1</deviceType>'
+            '<friendlyName> Media </friendlyName>'
+            '</device></root>'
+        )
+
+        self.assertEqual(description, {
+            'friendly_name': 'Media',
+            'device_type': 'urn:schemas-upnp-org:device:MediaServer:1',
+            'url_base': None,
+            'services': []
+        })
+
+
+class TestParseServiceDescription(unittest.TestCase):
+
+    def setUp(self):
+        actions, state_variables = SSDPDescription.parse_service_description(
+            read_xml('service_templates', 'WANPPPConnection.1.xml')
+        )
+        self.actions = {action['name']: action for action in actions}
+        self.state_variables = {state_variable['name']: state_variable for state_variable in state_variables}
+
+    def test_actions(self):
+        self.assertEqual(len(self.actions), 11)
+        self.assertIn('AddPortMapping', self.actions)
+        self.assertEqual(self.actions['RequestConnection']['arguments'], [])
+
+    def test_action_arguments(self):
+        self.assertEqual(self.actions['GetSpecificPortMappingEntry']['arguments'][:2], [
+            {'name': 'NewRemoteHost', 'direction': 'in', 'return_value': None, 'related_state_variable': 'RemoteHost'},
+            {'name': 'NewExternalPort', 'direction': 'in', 'return_value': None,
+             'related_state_variable': 'ExternalPort'}
+        ])
+        self.assertEqual(
+            [argument['direction'] for argument in self.actions['GetSpecificPortMappingEntry']['arguments']],
+            ['in'] * 3 + ['out'] * 5
+        )
+
+    def test_state_variables(self):
+        self.assertEqual(len(self.state_variables), 19)
+        self.assertEqual(self.state_variables['ExternalPort'], {
+            'name': 'ExternalPort', 'data_type': 'ui2', 'allowed_value_list': [], 'allowed_value_range': None
+        })
+        self.assertEqual(self.state_variables['PortMappingProtocol']['allowed_value_list'], ['TCP', 'UDP'])
+
+    def test_return_value_and_allowed_value_range(self):
+        actions, state_variables = SSDPDescription.parse_service_description(
+            '<scpd xmlns="urn:schemas-upnp-org:service-1-0"><actionList><action><name>GetVolume</name>'
+            '<argumentList><argument><name>CurrentVolume</name><direction>out</direction><retval/>'
+            '<relatedStateVariable>Volume</relatedStateVariable></argument></argumentList></action></actionList>'
+            '<serviceStateTable><stateVariable sendEvents="no"><name>Volume</name><dataType>ui2</dataType>'
+            '<allowedValueRange><minimum>0</minimum><maximum>100</maximum><step>5</step></allowedValueRange>'
+            '</stateVariable></serviceStateTable></scpd>'
+        )
+
+        self.assertEqual(actions[0]['arguments'][0]['return_value'], '')
+        self.assertEqual(state_variables[0]['allowed_value_range'], {'minimum': '0', 'maximum': '100', 'step': '5'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+
+from upnpy.ssdp.SSDPResponse import DuplicateResponseFilter, SSDPResponse, parse_notify, parse_search_response
+
+
+def get_search_response(status_line='HTTP/1.1 200 OK', **headers):
+    response_headers = {
+        'CACHE-CONTROL': 'max-age=1800',
+        'EXT': '',
+        'LOCATION': 'http://192.168.1.1:5431/dyndev/uuid:c8d12a3b-22a7-a722-3b2a-d1c8d13ba70000',
+        'SERVER': 'Linux/2.6 UPnP/1.0 TestModel/1.0',
+        'ST': 'upnp:rootdevice',
+        'USN': 'uuid:c8d12a3b-22a7-a722-3b2a-d1c8d13ba70000::upnp:rootdevice'
+    }
+    response_headers.update(headers)
+
+    lines = [status_line] + [f'{name}: {value}' for name, value in response_headers.items() if value is not None]
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode()
+
+
+class TestParseSearchResponse(unittest.TestCase):
+
+    def test_headers(self):
+        headers = parse_search_response(get_search_response())
+
+        self.assertEqual(headers.start_line, 'HTTP/1.1 200 OK')
+        self.assertEqual(headers['usn'], 'uuid:c8d12a3b-22a7-a722-3b2a-d1c8d13ba70000::upnp:rootdevice')
+        self.assertEqual(headers['ext'], '')
+
+    def test_headers_are_case_insensitive(self):
+        headers = parse_search_response(get_search_response())
+
+        self.assertEqual(headers['Location'], headers['LOCATION'])
+        self.assertEqual(headers.get('Cache-Control'), 'max-age=1800')
+        self.assertIn('St', headers)
+        self.assertIsNone(headers.get('BOOTID.UPNP.ORG'))
+
+    def test_first_value_of_repeated_header(self):
+        response = get_search_response().replace(b'EXT:', b'ST: ssdp:all\r\nEXT:')
+        self.assertEqual(parse_search_response(response)['st'], 'ssdp:all')
+
+    def test_values_containing_colons(self):
+        headers = parse_search_response(get_search_response(LOCATION='http://[fe80::1]:5431/desc.xml'))
+        self.assertEqual(headers['location'], 'http://[fe80::1]:5431/desc.xml')
+
+    def test_rejected_datagrams(self):
+        for datagram in (
+            get_search_response('HTTP/1.1 404 Not Found'),
+            get_search_response('M-SEARCH * HTTP/1.1'),
+            get_search_response(LOCATION=None),
+            get_search_response(LOCATION=''),
+            b'HTTP/1.1 200 OK\r\nnot a header\r\n\r\n',
+            b'garbage'
+        ):
+            self.assertIsNone(parse_search_response(datagram), datagram)
+
+    def test_notify_is_not_a_search_response(self):
+        notify = b'NOTIFY * HTTP/1.1\r\nLOCATION: http://192.168.1.1/\r\nNT: upnp:rootdevice\r\n' \
+                 b'NTS: ssdp:alive\r\nUSN: uuid:1::upnp:rootdevice\r\n\r\n'
+
+        self.assertIsNone(parse_search_response(notify))
+        self.assertEqual(parse_notify(notify)['nts'], 'ssdp:alive')
+
+
+class TestDuplicateResponseFilter(unittest.TestCase):
+
+    def setUp(self):
+        self.duplicate_filter = DuplicateResponseFilter()
+
+    def is_duplicate(self, **headers):
+        return self.duplicate_filter.is_duplicate(parse_search_response(get_search_response(**headers)))
+
+    def test_first_response_is_not_a_duplicate(self):
+        self.assertFalse(self.is_duplicate())
+        self.assertTrue(self.is_duplicate())
+
+    def test_same_usn(self):
+        self.assertFalse(self.is_duplicate())
+        self.assertTrue(self.is_duplicate(LOCATION='http://192.168.1.1:5431/other.xml'))
+
+    def test_same_location(self):
+        # Embedded devices and services of a device respond with their own USN but the same location
+        self.assertFalse(self.is_duplicate())
+        self.assertTrue(self.is_duplicate(USN='uuid:c8d12a3b-22a7-a722-3b2a-d1c8d13ba70001::urn:schemas-upnp-org:'
+                                              'device:WANDevice:1'))
+
+    def test_different_devices(self):
+        self.assertFalse(self.is_duplicate())
+        self.assertFalse(self.is_duplicate(USN='uuid:2::upnp:rootdevice', LOCATION='http://192.168.1.2/desc.xml'))
+
+    def test_responses_without_usn(self):
+        self.assertFalse(self.is_duplicate(USN=None))
+        self.assertFalse(self.is_duplicate(USN=None, LOCATION='http://192.168.1.2/desc.xml'))
+        self.assertTrue(self.is_duplicate(USN=None, LOCATION='http://192.168.1.2/desc.xml'))
+
+
+class TestSSDPResponse(unittest.TestCase):
+
+    def test_attributes(self):
+        ssdp_response = SSDPResponse(('192.168.1.1', 1900), get_search_response(), '192.168.1.2')
+
+        self.assertEqual((ssdp_response.host, ssdp_response.port), ('192.168.1.1', 1900))
+        self.assertEqual(ssdp_response.interface, '192.168.1.2')
+        self.assertEqual(ssdp_response.headers['st'], 'upnp:rootdevice')
+        self.assertTrue(ssdp_response.response.startswith('HTTP/1.1 200 OK\r\n'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -27,6 +27,7 @@ License
 """
 
 from upnpy.upnp.UPnP import UPnP
+from upnpy.upnp.AsyncUPnP import AsyncUPnP
 
 
 __version__ = '1.1.8'
@@ -0,0 +1,131 @@
+import asyncio
+import email.parser
+import http.client
+import io
+import urllib.error
+import urllib.parse
+
+from upnpy.connection_pool import HTTPResponse
+
+
+DEFAULT_TIMEOUT = 10
+
+
+async def _read_body(reader, headers):
+
+    """
+    Read the response body according to the transfer encoding and length the device announced.
+    """
+
+    if headers.get('Transfer-Encoding', '').lower() == 'chunked':
+        chunks = []
+
+        while True:
+            chunk_size = int((await reader.readline()).split(b';', 1)[0].strip(), 16)
+            if chunk_size == 0:
+                # Skip the trailer
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                break
+
+            chunks.append(await reader.readexactly(chunk_size))
+            await reader.readline()
+
+        return b''.join(chunks)
+
+    content_length = headers.get('Content-Length')
+    if content_length is not None:
+        return await reader.readexactly(int(content_length))
+
+    return await reader.read()
+
+
+async def _exchange(parsed_url, method, data, headers):
+    reader, writer = await asyncio.open_connection(parsed_url.hostname, parsed_url.port or 80)
+
+    try:
+        path = parsed_url.path or '/'
+        if parsed_url.query:
+            path += '?' + parsed_url.query
+
+        request_headers = {'Host': parsed_url.netloc, 'Connection': 'close'}
+        request_headers.update(headers)
+
+        if data is not None:
+            request_headers['Content-Length'] = len(data)
+
+        raw_request = f'{method} {path} HTTP/1.1\r\n'
+        for header, value in request_headers.items():
+            raw_request += f'{header}: {value}\r\n'
+        raw_request += '\r\n'
+
+        writer.write(raw_request.encode('latin-1') + (data or b''))
+        await writer.drain()
+
+        status_line = (await reader.readline()).decode('latin-1').rstrip('\r\n')
+        try:
+            _, status, reason = (status_line.split(' ', 2) + [''])[:3]
+            status = int(status)
+        except ValueError:
+            raise http.client.BadStatusLine(status_line)
+
+        raw_headers = b''
+        while True:
+            header_line = await reader.readline()
+            if header_line in (b'\r\n', b'\n', b''):
+                break
+            raw_headers += header_line
+
+        response_headers = email.parser.BytesParser(_class=http.client.HTTPMessage).parsebytes(raw_headers)
+
+        body = await _read_body(reader, response_headers)
+    finally:
+        writer.close()
+
+    return status, reason, response_headers, body
+
+
+async def make_http_request(url, data=None, headers=None, method=None, timeout=DEFAULT_TIMEOUT):
+
+    """
+        **Make an HTTP request from a coroutine**
+
+        Asynchronous counterpart of :func:`upnpy.utils.make_http_request`. Errors are reported the same way:
+        error responses raise a ``urllib.error.HTTPError`` and connection problems raise a
+        ``urllib.error.URLError``.
+
+        :param url: The URL to which a request should be made
+        :type url: str
+        :param data: Request body. The request method defaults to POST if data is provided
+        :type data: bytes
+        :param headers: Headers to send with the request
+        :type headers: dict
+        :param method: Request method, defaults to GET or POST depending on whether data is provided
+        :type method: str
+        :param timeout: Timeout in seconds for the whole request
+        :type timeout: float
+        :return: The fully read response
+        :rtype: upnpy.connection_pool.HTTPResponse
+    """
+
+    parsed_url = urllib.parse.urlsplit(url)
+
+    if parsed_url.scheme != 'http':
+        raise urllib.error.URLError(f'unknown url type: {parsed_url.scheme!r}')
+
+    if method is None:
+        method = 'POST' if data is not None else 'GET'
+
+    try:
+        status, reason, response_headers, body = await asyncio.wait_for(
+            _exchange(parsed_url, method, data, headers or {}),
+            timeout
+        )
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+            http.client.HTTPException, ValueError) as e:
+        raise urllib.error.URLError(e)
+
+    if not 200 <= status < 300:
+        raise urllib.error.HTTPError(url, status, reason, response_headers, io.BytesIO(body))
+
+    return HTTPResponse(url, status, reason, response_headers, body)
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import urllib.error
+
+import upnpy.utils as utils
+
+
+class DescriptionCache:
+
+    """
+        **Persistent description cache**
+
+        Stores device descriptions and SCPDs on disk so that they don't have to be downloaded again on every start.
+
+        A cached description is reused without any request when the device announced the same
+        ``BOOTID.UPNP.ORG`` and ``CONFIGID.UPNP.ORG`` values as when it was stored. Otherwise it is revalidated
+        with a conditional request using the ``ETag`` / ``Last-Modified`` values the device sent, if any.
+        Least recently used entries are evicted once the cache grows beyond ``max_size`` bytes.
+
+        :param directory: Directory in which the cached descriptions are stored
+        :type directory: str
+        :param max_size: Maximum total size of the cache in bytes
+        :type max_size: int
+    """
+
+    def __init__(self, directory, max_size=16 * 1024 * 1024):
+        self.directory = directory
+        self.max_size = max_size
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+
+    def fetch(self, url, boot_id=None, config_id=None):
+
+        """
+            **Get a description through the cache**
+
+            Returns the cached description for the URL if it is still valid, otherwise retrieves it from the device
+            and stores it in the cache.
+
+            :param url: URL of the description
+            :type url: str
+            :param boot_id: Value of the ``BOOTID.UPNP.ORG`` header announced by the device
+            :type boot_id: str
+            :param config_id: Value of the ``CONFIGID.UPNP.ORG`` header announced by the device
+            :type config_id: str
+            :return: The description
+            :rtype: bytes
+        """
+
+        metadata, description = self._read(url)
+
+        if description is not None:
+            if (boot_id, config_id) != (None, None) and \
+                    (metadata.get('boot_id'), metadata.get('config_id')) == (boot_id, config_id):
+                if metadata.get('status') == 404:
+                    raise urllib.error.HTTPError(url, 404, 'Not Found (cached)', {}, None)
+                return description
+
+            if metadata.get('status') == 404:
+                description = None
+
+        headers = {}
+
+        if description is not None:
+            if metadata.get('etag'):
+                headers['If-None-Match'] = metadata['etag']
+            if metadata.get('last_modified'):
+                headers['If-Modified-Since'] = metadata['last_modified']
+
+        try:
+            response = utils.make_http_request(url, headers=headers)
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and description is not None:
+                metadata.update(boot_id=boot_id, config_id=config_id)
+                self._write(url, metadata, description)
+                return description
+
+            # Remember missing descriptions as well, as long as the device lets us tell when they could change
+            if e.code == 404 and (boot_id, config_id) != (None, None):
+                self._write(url, {'url': url, 'boot_id': boot_id, 'config_id': config_id, 'status': 404}, b'')
+            raise
+
+        description = response.read()
+        metadata = {
+            'url': url,
+            'boot_id': boot_id,
+            'config_id': config_id,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified')
+        }
+
+        self._write(url, metadata, description)
+        return description
+
+    def clear(self):
+
+        """
+            **Remove all cached descriptions**
+        """
+
+        with self._lock:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.cache'):
+                    os.remove(entry.path)
+
+    def _get_path(self, url):
+        return os.path.join(self.directory, hashlib.sha1(url.encode()).hexdigest() + '.cache')
+
+    def _read(self, url):
+
+        """
+        Read the metadata and description stored for a URL. The file starts with a line of JSON metadata
+        followed by the raw description.
+        """
+
+        path = self._get_path(url)
+
+        try:
+            with open(path, 'rb') as f:
+                metadata = json.loads(f.readline().decode())
+                description = f.read()
+
+            # Mark the entry as recently used for eviction
+            os.utime(path)
+        except (OSError, ValueError):
+            return {}, None
+
+        if metadata.get('url') != url:
+            return {}, None
+
+        return metadata, description
+
+    def _write(self, url, metadata, description):
+        path = self._get_path(url)
+
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(file_descriptor, 'wb') as f:
+            f.write(json.dumps(metadata).encode() + b'\n')
+            f.write(description)
+
+        with self._lock:
+            os.replace(temporary_path, path)
+            self._evict()
+
+    def _evict(self):
+
+        """
+        Remove the least recently used entries until the cache fits within its maximum size.
+        """
+
+        entries = []
+        total_size = 0
+
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.cache'):
+                entry_stat = entry.stat()
+                entries.append((entry_stat.st_mtime, entry_stat.st_size, entry.path))
+                total_size += entry_stat.st_size
+
+        entries.sort()
+
+        while total_size > self.max_size and entries:
+            _, size, path = entries.pop(0)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total_size -= size
@@ -0,0 +1,231 @@
+import collections
+import http.client
+import io
+import threading
+import time
+import urllib.error
+import urllib.parse
+
+
+# Errors indicating that a kept-alive connection was closed by the device in the meantime
+_STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+_REDIRECT_CODES = (301, 302, 303, 307, 308)
+_MAX_REDIRECTS = 5
+
+
+class HTTPResponse:
+
+    """
+        **Fully read HTTP response**
+
+        Response returned by :meth:`HTTPConnectionPool.request`. The body has already been read so that the
+        connection could be returned to the pool.
+
+        :param url: URL the request was made to
+        :type url: str
+        :param status: HTTP status code
+        :type status: int
+        :param reason: HTTP reason phrase
+        :type reason: str
+        :param headers: Response headers
+        :type headers: http.client.HTTPMessage
+        :param body: Response body
+        :type body: bytes
+    """
+
+    def __init__(self, url, status, reason, headers, body):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+        self._body_stream = io.BytesIO(body)
+
+    def read(self, amount=-1):
+        return self._body_stream.read(amount)
+
+    def getcode(self):
+        return self.status
+
+    def close(self):
+        self._body_stream.close()
+
+
+class HTTPConnectionPool:
+
+    """
+        **Persistent HTTP connection pool**
+
+        Keeps HTTP/1.1 connections to devices alive so that description retrieval and action invocation don't
+        need a new TCP handshake for every request.
+
+        :param max_connections: Maximum number of simultaneous connections per device (host and port)
+        :type max_connections: int
+        :param idle_timeout: Amount of time in seconds after which an unused connection is closed
+        :type idle_timeout: float
+        :param timeout: Connect and read timeout in seconds for every request
+        :type timeout: float
+    """
+
+    def __init__(self, max_connections=2, idle_timeout=30, timeout=10):
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._idle_connections = collections.defaultdict(collections.deque)
+        self._host_semaphores = {}
+
+    def request(self, url, data=None, headers=None, method=None):
+
+        """
+            **Make an HTTP request over a pooled connection**
+
+            Errors are reported the same way ``urllib.request.urlopen`` does: error responses raise a
+            ``urllib.error.HTTPError`` and connection problems raise a ``urllib.error.URLError``.
+
+            :param url: The URL to which a request should be made
+            :type url: str
+            :param data: Request body. The request method defaults to POST if data is provided
+            :type data: bytes
+            :param headers: Headers to send with the request
+            :type headers: dict
+            :param method: Request method, defaults to GET or POST depending on whether data is provided
+            :type method: str
+            :return: The response
+            :rtype: HTTPResponse
+        """
+
+        if method is None:
+            method = 'POST' if data is not None else 'GET'
+
+        for _ in range(_MAX_REDIRECTS + 1):
+            response = self._request(url, method, data, headers or {})
+
+            # Follow redirects for GET requests like urllib does
+            location = response.headers.get('Location')
+            if response.status in _REDIRECT_CODES and method == 'GET' and location:
+                url = urllib.parse.urljoin(url, location)
+                continue
+
+            if not 200 <= response.status < 300:
+                raise urllib.error.HTTPError(
+                    url, response.status, response.reason, response.headers, io.BytesIO(response.body)
+                )
+
+            return response
+
+        raise urllib.error.HTTPError(url, response.status, 'Too many redirects.', response.headers, None)
+
+    def close(self):
+
+        """
+            **Close all idle connections**
+        """
+
+        with self._lock:
+            idle_connections = list(self._idle_connections.values())
+            self._idle_connections.clear()
+
+        for connections in idle_connections:
+            for connection, _ in connections:
+                connection.close()
+
+    def _request(self, url, method, data, headers):
+        parsed_url = urllib.parse.urlsplit(url)
+
+        if parsed_url.scheme not in ('http', 'https'):
+            raise urllib.error.URLError(f'unknown url type: {parsed_url.scheme!r}')
+
+        key = (parsed_url.scheme, parsed_url.hostname, parsed_url.port)
+        path = parsed_url.path or '/'
+        if parsed_url.query:
+            path += '?' + parsed_url.query
+
+        with self._get_host_semaphore(key):
+            connection, reused = self._get_connection(key)
+
+            try:
+                try:
+                    response = self._send(connection, method, path, data, headers)
+                except _STALE_CONNECTION_ERRORS:
+                    if not reused:
+                        raise
+
+                    # The device dropped the kept-alive connection, retry once on a new one
+                    connection.close()
+                    connection = self._new_connection(key)
+                    response = self._send(connection, method, path, data, headers)
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                raise urllib.error.URLError(e)
+
+            if response.will_close:
+                connection.close()
+            else:
+                self._release_connection(key, connection)
+
+        return HTTPResponse(url, response.status, response.reason, response.headers, response.body)
+
+    @staticmethod
+    def _send(connection, method, path, data, headers):
+        connection.request(method, path, body=data, headers=headers)
+        response = connection.getresponse()
+        response.body = response.read()
+        return response
+
+    def _get_host_semaphore(self, key):
+        with self._lock:
+            if key not in self._host_semaphores:
+                self._host_semaphores[key] = threading.BoundedSemaphore(self.max_connections)
+            return self._host_semaphores[key]
+
+    def _get_connection(self, key):
+
+        """
+        Get an idle connection for the host if one is available, otherwise open a new one.
+        """
+
+        expired_connections = []
+        connection = None
+
+        with self._lock:
+            idle_connections = self._idle_connections[key]
+            now = time.monotonic()
+
+            while idle_connections:
+                idle_connection, last_used = idle_connections.pop()
+                if now - last_used < self.idle_timeout:
+                    connection = idle_connection
+                    break
+                expired_connections.append(idle_connection)
+
+        for expired_connection in expired_connections:
+            expired_connection.close()
+
+        if connection is not None:
+            return connection, True
+        return self._new_connection(key), False
+
+    def _new_connection(self, key):
+        scheme, host, port = key
+
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def _release_connection(self, key, connection):
+        expired_connections = []
+
+        with self._lock:
+            now = time.monotonic()
+            self._idle_connections[key].append((connection, now))
+
+            # The oldest idle connections are at the left of each queue
+            for idle_connections in self._idle_connections.values():
+                while idle_connections and now - idle_connections[0][1] >= self.idle_timeout:
+                    expired_connections.append(idle_connections.popleft()[0])
+
+        for expired_connection in expired_connections:
+            expired_connection.close()
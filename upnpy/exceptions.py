@@ -12,6 +12,20 @@ class SOAPError(Exception):
         self.error = code
 
 
+class SubscriptionError(Exception):
+
+    """
+        **Custom GENA subscription exception**
+
+        Custom subscription exception class.
+        Raised whenever a device rejected a request to subscribe to, renew or cancel an event subscription.
+    """
+
+    def __init__(self, message, code):
+        self.message = message
+        self.code = code
+
+
 class IGDError(Exception):
 
     """
@@ -0,0 +1,397 @@
+import collections
+import http.server
+import queue
+import socket
+import socketserver
+import threading
+import urllib.error
+import uuid
+from urllib.parse import urlparse
+from xml.etree.ElementTree import ParseError
+
+from upnpy.gena import GENA
+from upnpy import exceptions
+
+
+Event = collections.namedtuple('Event', ['subscription', 'seq', 'properties'])
+
+# Delay in seconds before subscribing again after a subscription couldn't be renewed
+_RETRY_INTERVAL = 30
+
+# Devices may send the initial event before the SUBSCRIBE response has been processed, in seconds
+_SUBSCRIBE_WAIT = 5
+
+
+class Subscription:
+
+    """
+        **Event subscription of a service**
+
+        Created by :meth:`EventListener.subscribe`. The subscription is renewed in the background halfway through the
+        duration granted by the device. If the device no longer knows the subscription, e.g. because it rebooted, a
+        new one is made.
+
+        :param listener: Listener receiving the events of the subscription
+        :type listener: EventListener
+        :param service: The subscribed service
+        :type service: SSDPDevice.Service
+        :param path: Path of the callback URL of the subscription
+        :type path: str
+        :param callback: Function called with every :class:`Event`, events are put in the listener's queue if not set
+        :type callback: callable
+        :param timeout: Requested subscription duration in seconds
+        :type timeout: int
+    """
+
+    def __init__(self, listener, service, path, callback=None, timeout=GENA.DEFAULT_TIMEOUT):
+        self.service = service
+        self.callback = callback
+        self.sid = None
+        self.timeout = None
+        self.seq = None
+        self._listener = listener
+        self._path = path
+        self._requested_timeout = timeout
+        self._lock = threading.Lock()
+        self._subscribed = threading.Event()
+        self._renewal_timer = None
+        self._cancelled = False
+
+    def renew(self):
+
+        """
+            **Renew the subscription now**
+
+            :return: The subscription duration granted by the device
+            :rtype: int
+        """
+
+        self.timeout = GENA.renew(self.service, self.sid, self._requested_timeout)
+        self._schedule_renewal()
+        return self.timeout
+
+    def unsubscribe(self):
+
+        """
+            **Cancel the subscription**
+        """
+
+        self._listener.unsubscribe(self)
+
+    def _subscribe(self):
+
+        """
+        Make a new subscription, events are held back until its SID is known.
+        """
+
+        self._subscribed.clear()
+
+        try:
+            self.sid, self.timeout = GENA.subscribe(
+                self.service, self._listener._get_callback_url(self.service, self._path), self._requested_timeout
+            )
+            self.seq = None
+        finally:
+            self._subscribed.set()
+
+        self._schedule_renewal()
+
+    def _schedule_renewal(self, delay=None):
+        if self._renewal_timer is not None:
+            self._renewal_timer.cancel()
+
+        if delay is None:
+            if self.timeout is None:
+                return
+            delay = self.timeout / 2
+
+        if self._cancelled:
+            return
+
+        self._renewal_timer = threading.Timer(delay, self._renew_in_background)
+        self._renewal_timer.daemon = True
+        self._renewal_timer.start()
+
+    def _renew_in_background(self):
+        if self._cancelled:
+            return
+
+        try:
+            self.renew()
+            return
+        except (exceptions.SubscriptionError, urllib.error.URLError):
+            pass
+
+        try:
+            self._subscribe()
+        except (exceptions.SubscriptionError, urllib.error.URLError):
+            self._schedule_renewal(_RETRY_INTERVAL)
+
+    def _cancel(self):
+        self._cancelled = True
+
+        if self._renewal_timer is not None:
+            self._renewal_timer.cancel()
+
+    def _deliver(self, event):
+
+        """
+        Hand an event to the callback or the listener's queue. Events older than the last delivered one are dropped,
+        since every NOTIFY request is handled in its own thread.
+        """
+
+        with self._lock:
+            if self.seq is not None and event.seq != 0 and event.seq <= self.seq:
+                return
+            self.seq = event.seq
+
+            # Cached action results may no longer reflect the evented state
+            if self.service.result_cache is not None:
+                self.service.result_cache.invalidate()
+
+            if self.callback is not None:
+                self.callback(event)
+            else:
+                self._listener.events.put(event)
+
+    def __repr__(self):
+        return f'<Subscription ({self.service.type_}) sid="{self.sid}">'
+
+
+class _NotifyServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class _NotifyHandler(http.server.BaseHTTPRequestHandler):
+
+    """
+    Handler for the NOTIFY requests devices send events with.
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_NOTIFY(self):
+        status, subscription, event = self.server.listener._accept_notify(self.path, self.headers, self._read_body())
+
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+        self.wfile.flush()
+
+        if event is not None:
+            subscription._deliver(event)
+
+    def _read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() != 'chunked':
+            return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+        chunks = []
+
+        while True:
+            chunk_size = int(self.rfile.readline().split(b';', 1)[0], 16)
+            if not chunk_size:
+                break
+            chunks.append(self.rfile.read(chunk_size))
+            self.rfile.readline()
+
+        # Skip the trailer
+        while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+            pass
+
+        return b''.join(chunks)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class EventListener:
+
+    """
+        **GENA event listener**
+
+        Receives the events of services through a local HTTP server shared by all subscriptions, instead of polling
+        the state of the services with actions. Every event is delivered as an :class:`Event` holding the new values
+        of the evented state variables, either to the callback of its subscription or to the ``events`` queue.
+
+        :param host: Local address to listen on, all addresses by default
+        :type host: str
+        :param port: Local port to listen on, a free port is chosen by default
+        :type port: int
+        :param callback_host: Address the devices should send their events to, by default the address of the local
+                              interface each device is reached through
+        :type callback_host: str
+    """
+
+    def __init__(self, host='', port=0, callback_host=None):
+        self.host = host
+        self.port = port
+        self.callback_host = callback_host
+        self.events = queue.Queue()
+
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+        self._server = None
+        self._thread = None
+
+    def start(self):
+
+        """
+            **Start the callback server in the background**
+
+            :return: The listener itself
+            :rtype: EventListener
+        """
+
+        if self._server is not None:
+            return self
+
+        self._server = _NotifyServer((self.host, self.port), _NotifyHandler)
+        self._server.listener = self
+
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+        return self
+
+    def stop(self):
+
+        """
+            **Cancel all subscriptions and stop the callback server**
+        """
+
+        if self._server is None:
+            return
+
+        for subscription in self.get_subscriptions():
+            try:
+                self.unsubscribe(subscription)
+            except (exceptions.SubscriptionError, urllib.error.URLError):
+                pass
+
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+        self._thread = None
+
+    def is_listening(self):
+
+        """
+            **Check whether the callback server is running**
+
+            :rtype: bool
+        """
+
+        return self._server is not None
+
+    def subscribe(self, service, callback=None, timeout=GENA.DEFAULT_TIMEOUT):
+
+        """
+            **Subscribe to the events of a service**
+
+            The callback server is started if it isn't running yet. The device sends an initial event with the
+            current values of all evented state variables right after subscribing.
+
+            :param service: The service to subscribe to
+            :type service: SSDPDevice.Service
+            :param callback: Function called with every :class:`Event` of the service, events are put in the
+                             ``events`` queue if not set
+            :type callback: callable
+            :param timeout: Requested subscription duration in seconds, it is renewed automatically
+            :type timeout: int
+            :return: The subscription
+            :rtype: Subscription
+        """
+
+        self.start()
+
+        path = f'/{uuid.uuid4().hex}'
+        subscription = Subscription(self, service, path, callback, timeout)
+
+        with self._lock:
+            self._subscriptions[path] = subscription
+
+        try:
+            subscription._subscribe()
+        except Exception:
+            with self._lock:
+                del self._subscriptions[path]
+            subscription._cancel()
+            raise
+
+        return subscription
+
+    def unsubscribe(self, subscription):
+
+        """
+            **Cancel a subscription**
+
+            :param subscription: The subscription to cancel
+            :type subscription: Subscription
+        """
+
+        subscription._cancel()
+
+        with self._lock:
+            if self._subscriptions.pop(subscription._path, None) is None:
+                return
+
+        GENA.unsubscribe(subscription.service, subscription.sid)
+
+    def get_subscriptions(self):
+
+        """
+            **Get all active subscriptions**
+
+            :rtype: list
+        """
+
+        with self._lock:
+            return list(self._subscriptions.values())
+
+    def _get_callback_url(self, service, path):
+        host = self.callback_host
+
+        if host is None:
+            # The address of the interface the device is reached through is the one it can send events to
+            parsed_base_url = urlparse(service.base_url)
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe_socket:
+                probe_socket.connect((parsed_base_url.hostname, parsed_base_url.port or 80))
+                host = probe_socket.getsockname()[0]
+
+        return f'http://{host}:{self._server.server_address[1]}{path}'
+
+    def _accept_notify(self, path, headers, body):
+
+        """
+        Check a NOTIFY request against the subscription of its callback URL and parse its event.
+        Returns the status to respond with, the subscription and the event if it should be delivered.
+        """
+
+        with self._lock:
+            subscription = self._subscriptions.get(path)
+
+        if subscription is None or not subscription._subscribed.wait(_SUBSCRIBE_WAIT):
+            return 412, None, None
+
+        if headers.get('NT') != 'upnp:event' or headers.get('NTS') != 'upnp:propchange':
+            return 400, None, None
+
+        if headers.get('SID') != subscription.sid:
+            return 412, None, None
+
+        try:
+            seq = int(headers.get('SEQ'))
+            properties = GENA.parse_property_set(body)
+        except (TypeError, ValueError, ParseError):
+            return 400, None, None
+
+        return 200, subscription, Event(subscription, seq, properties)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
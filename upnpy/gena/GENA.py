@@ -0,0 +1,138 @@
+import re
+import urllib.error
+
+import upnpy.utils as utils
+from upnpy import exceptions
+
+
+# Subscription duration requested from devices in seconds, the UDA recommends at least 1800
+DEFAULT_TIMEOUT = 1800
+
+_TIMEOUT_PATTERN = re.compile(r'second-(\d+)', re.IGNORECASE)
+
+
+def parse_timeout(timeout):
+
+    """
+        **Parse the TIMEOUT header of a subscription response**
+
+        :param timeout: Value of the TIMEOUT header (e.g.: ``Second-1800``)
+        :type timeout: str
+        :return: Subscription duration in seconds, or None if the subscription doesn't expire or the header is missing
+        :rtype: int
+    """
+
+    if not timeout:
+        return None
+
+    duration = _TIMEOUT_PATTERN.search(timeout)
+    if duration is None:
+        return None
+    return int(duration.group(1))
+
+
+def _send_request(service, method, headers):
+
+    """
+    Send a GENA request to the event subscription URL of a service.
+    """
+
+    if service._full_event_sub_url is None:
+        raise exceptions.NotAvailableError(f'The {service.type_} service doesn\'t support eventing.')
+
+    try:
+        return utils.make_http_request(service._full_event_sub_url, headers=headers, method=method)
+    except urllib.error.HTTPError as e:
+        raise exceptions.SubscriptionError(f'{method} request failed: {e.code} {e.reason}', e.code)
+
+
+def subscribe(service, callback_url, timeout=DEFAULT_TIMEOUT):
+
+    """
+        **Subscribe to the events of a service**
+
+        :param service: The service to subscribe to
+        :type service: SSDPDevice.Service
+        :param callback_url: URL the device should send its events to
+        :type callback_url: str
+        :param timeout: Requested subscription duration in seconds, or None to request an infinite subscription
+        :type timeout: int
+        :return: The subscription ID and the subscription duration granted by the device
+        :rtype: tuple
+    """
+
+    response = _send_request(service, 'SUBSCRIBE', {
+        'CALLBACK': f'<{callback_url}>',
+        'NT': 'upnp:event',
+        'TIMEOUT': f'Second-{timeout}' if timeout is not None else 'Second-infinite'
+    })
+
+    sid = response.headers.get('SID')
+    if not sid:
+        raise exceptions.SubscriptionError('The device did not return a subscription ID.', response.status)
+
+    return sid, parse_timeout(response.headers.get('TIMEOUT'))
+
+
+def renew(service, sid, timeout=DEFAULT_TIMEOUT):
+
+    """
+        **Renew a subscription before it expires**
+
+        :param service: The subscribed service
+        :type service: SSDPDevice.Service
+        :param sid: The subscription ID
+        :type sid: str
+        :param timeout: Requested subscription duration in seconds, or None to request an infinite subscription
+        :type timeout: int
+        :return: The subscription duration granted by the device
+        :rtype: int
+    """
+
+    response = _send_request(service, 'SUBSCRIBE', {
+        'SID': sid,
+        'TIMEOUT': f'Second-{timeout}' if timeout is not None else 'Second-infinite'
+    })
+
+    return parse_timeout(response.headers.get('TIMEOUT'))
+
+
+def unsubscribe(service, sid):
+
+    """
+        **Cancel a subscription**
+
+        :param service: The subscribed service
+        :type service: SSDPDevice.Service
+        :param sid: The subscription ID
+        :type sid: str
+    """
+
+    _send_request(service, 'UNSUBSCRIBE', {'SID': sid})
+
+
+def parse_property_set(body):
+
+    """
+        **Parse the property set of an event**
+
+        :param body: Body of a NOTIFY request
+        :type body: bytes
+        :return: Dictionary of the new values of the evented state variables by their names
+        :rtype: dict
+    """
+
+    properties = {}
+    depth = 0
+
+    for event, tag, element in utils.iterparse_xml(body):
+        if event == 'start':
+            depth += 1
+            continue
+
+        # Variables are the children of the <property> elements: <propertyset><property><Variable>
+        if depth == 3:
+            properties[tag] = element.text or ''
+        depth -= 1
+
+    return properties
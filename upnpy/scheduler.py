@@ -0,0 +1,237 @@
+import asyncio
+import collections
+import functools
+import threading
+import time
+
+
+# Maximum number of SOAP requests in flight per device by default, the same as the connections per device of the pool
+DEFAULT_MAX_IN_FLIGHT = 2
+
+
+class _DeviceQueue:
+
+    """
+    Requests in flight to a device and the callers waiting for their turn, in order of arrival.
+    """
+
+    __slots__ = ('in_flight', 'waiters', 'next_start')
+
+    def __init__(self):
+        self.in_flight = 0
+        self.waiters = collections.deque()
+        self.next_start = 0.0
+
+
+class _AsyncSlot:
+
+    """
+    Asynchronous context manager for a request slot (contextlib.asynccontextmanager requires Python 3.7).
+    """
+
+    def __init__(self, scheduler, device):
+        self._scheduler = scheduler
+        self._device = device
+
+    async def __aenter__(self):
+        await self._scheduler.acquire_async(self._device)
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self._scheduler.release(self._device)
+
+
+class _Slot:
+
+    """
+    Context manager for a request slot.
+    """
+
+    def __init__(self, scheduler, device):
+        self._scheduler = scheduler
+        self._device = device
+
+    def __enter__(self):
+        self._scheduler.acquire(self._device)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._scheduler.release(self._device)
+
+
+def _wake_future(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class RequestScheduler:
+
+    """
+        **Per-device SOAP request scheduler**
+
+        Bounds the number of SOAP requests in flight to every device (by base URL), since many consumer devices fail
+        with errors or reset connections when they receive several requests at once. Requests beyond the limit wait
+        for their turn in the order they were made, from threads and coroutines alike. Optionally the rate at which
+        requests are started is limited per device as well. Different devices don't affect each other.
+
+        Synchronous requests are bounded by the ``max_connections`` of the connection pool as well, so raising
+        ``max_in_flight`` beyond it also requires a pool with more connections per device.
+
+        :param max_in_flight: Maximum number of concurrent requests per device
+        :type max_in_flight: int
+        :param rate_limit: Maximum number of requests started per second per device, unlimited if not set
+        :type rate_limit: float
+    """
+
+    def __init__(self, max_in_flight=DEFAULT_MAX_IN_FLIGHT, rate_limit=None):
+        self.max_in_flight = max_in_flight
+        self.rate_limit = rate_limit
+
+        self._lock = threading.Lock()
+        self._devices = {}
+
+    def request(self, device):
+
+        """
+            **Wait for a request slot for a device**
+
+            :param device: Base URL of the device
+            :type device: str
+            :return: Context manager holding the slot until it is exited
+        """
+
+        return _Slot(self, device)
+
+    def request_async(self, device):
+
+        """
+            **Wait for a request slot for a device from a coroutine**
+
+            :param device: Base URL of the device
+            :type device: str
+            :return: Asynchronous context manager holding the slot until it is exited
+        """
+
+        return _AsyncSlot(self, device)
+
+    def acquire(self, device):
+
+        """
+            **Acquire a request slot for a device**
+
+            Blocks until it is the caller's turn. Every slot has to be given back with :meth:`release`.
+
+            :param device: Base URL of the device
+            :type device: str
+        """
+
+        with self._lock:
+            device_queue = self._get_device_queue(device)
+
+            if device_queue.in_flight < self.max_in_flight and not device_queue.waiters:
+                device_queue.in_flight += 1
+                waiter = None
+            else:
+                waiter = threading.Event()
+                device_queue.waiters.append(waiter.set)
+
+        if waiter is not None:
+            waiter.wait()
+
+        self._wait_for_rate_limit(device)
+
+    async def acquire_async(self, device):
+
+        """
+            **Acquire a request slot for a device from a coroutine**
+
+            :param device: Base URL of the device
+            :type device: str
+        """
+
+        with self._lock:
+            device_queue = self._get_device_queue(device)
+
+            if device_queue.in_flight < self.max_in_flight and not device_queue.waiters:
+                device_queue.in_flight += 1
+                future = None
+            else:
+                loop = asyncio.get_event_loop()
+                future = loop.create_future()
+                wake = functools.partial(loop.call_soon_threadsafe, _wake_future, future)
+                device_queue.waiters.append(wake)
+
+        if future is not None:
+            try:
+                await future
+            except asyncio.CancelledError:
+                with self._lock:
+                    handed_over = wake not in device_queue.waiters
+                    if not handed_over:
+                        device_queue.waiters.remove(wake)
+
+                # Pass on the slot if it has been handed over to this coroutine already
+                if handed_over:
+                    self.release(device)
+                raise
+
+        delay = self._reserve_start(device)
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self.release(device)
+                raise
+
+    def release(self, device):
+
+        """
+            **Give back a request slot for a device**
+
+            The slot is handed over to the caller that has been waiting the longest, if any.
+
+            :param device: Base URL of the device
+            :type device: str
+        """
+
+        with self._lock:
+            device_queue = self._devices[device]
+
+            if device_queue.waiters:
+                wake = device_queue.waiters.popleft()
+            else:
+                wake = None
+                device_queue.in_flight -= 1
+
+                if not device_queue.in_flight and device_queue.next_start <= time.monotonic():
+                    del self._devices[device]
+
+        if wake is not None:
+            wake()
+
+    def _get_device_queue(self, device):
+        device_queue = self._devices.get(device)
+
+        if device_queue is None:
+            device_queue = self._devices[device] = _DeviceQueue()
+        return device_queue
+
+    def _reserve_start(self, device):
+
+        """
+        Reserve the next start time of the device according to the rate limit and return the time to wait for it.
+        """
+
+        if not self.rate_limit:
+            return 0
+
+        with self._lock:
+            device_queue = self._devices[device]
+            now = time.monotonic()
+            start = max(now, device_queue.next_start)
+            device_queue.next_start = start + 1 / self.rate_limit
+
+        return start - now
+
+    def _wait_for_rate_limit(self, device):
+        delay = self._reserve_start(device)
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,321 @@
+import base64
+import binascii
+import collections
+import datetime
+import math
+import re
+from xml.sax.saxutils import escape
+
+from upnpy import exceptions
+
+
+# Value ranges of the UPnP integer data types
+INTEGER_RANGES = {
+    'ui1': (0, 2 ** 8 - 1),
+    'ui2': (0, 2 ** 16 - 1),
+    'ui4': (0, 2 ** 32 - 1),
+    'ui8': (0, 2 ** 64 - 1),
+    'i1': (-2 ** 7, 2 ** 7 - 1),
+    'i2': (-2 ** 15, 2 ** 15 - 1),
+    'i4': (-2 ** 31, 2 ** 31 - 1),
+    'i8': (-2 ** 63, 2 ** 63 - 1),
+    'int': (-2 ** 31, 2 ** 31 - 1)
+}
+
+FLOAT_TYPES = frozenset(['r4', 'r8', 'number', 'fixed.14.4', 'float'])
+
+# Values accepted for boolean arguments, sent as "1" or "0" as recommended by UDA
+_BOOLEAN_VALUES = {'1': '1', '0': '0', 'true': '1', 'false': '0', 'yes': '1', 'no': '0'}
+
+DATE_TYPES = frozenset(['date', 'dateTime', 'dateTime.tz', 'time', 'time.tz'])
+
+_INVALID_IDENTIFIER_CHARACTERS = re.compile(r'\W')
+
+_DATE_TIME_PATTERN = re.compile(
+    r'^(?:(\d{4})-(\d{2})-(\d{2}))?T?(?:(\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,6})\d*)?)?(Z|[+-]\d{2}:?\d{2})?$'
+)
+
+
+def _parse_range(allowed_value_range, convert):
+
+    """
+    Convert the minimum, maximum and step of an allowedValueRange, leaving out values that can't be converted.
+    """
+
+    parsed_range = []
+
+    for bound in ('minimum', 'maximum', 'step'):
+        try:
+            parsed_range.append(convert((allowed_value_range or {}).get(bound)))
+        except (TypeError, ValueError):
+            parsed_range.append(None)
+
+    return parsed_range
+
+
+def _compile_integer_serializer(argument_name, data_type, allowed_value_range):
+    minimum, maximum = INTEGER_RANGES[data_type]
+    range_minimum, range_maximum, step = _parse_range(allowed_value_range, int)
+
+    if range_minimum is not None:
+        minimum = max(minimum, range_minimum)
+    if range_maximum is not None:
+        maximum = min(maximum, range_maximum)
+
+    def serialize(value):
+        if isinstance(value, bool):
+            raise exceptions.ArgumentError(f'Argument "{argument_name}" must be an integer ({data_type}).', argument_name)
+
+        try:
+            number = int(value)
+        except (TypeError, ValueError, OverflowError):
+            raise exceptions.ArgumentError(f'Argument "{argument_name}" must be an integer ({data_type}).', argument_name)
+
+        # int() silently truncates fractional numbers like 1.9
+        if not isinstance(value, (int, str)) and number != value:
+            raise exceptions.ArgumentError(f'Argument "{argument_name}" must be an integer ({data_type}).', argument_name)
+        value = number
+
+        if not minimum <= value <= maximum:
+            raise exceptions.ArgumentError(
+                f'Argument "{argument_name}" must be between {minimum} and {maximum}.', argument_name
+            )
+
+        if step and (value - minimum) % step:
+            raise exceptions.ArgumentError(
+                f'Argument "{argument_name}" must be a multiple of {step} from {minimum}.', argument_name
+            )
+
+        return str(value)
+
+    return serialize
+
+
+def _compile_float_serializer(argument_name, data_type, allowed_value_range):
+    minimum, maximum, _ = _parse_range(allowed_value_range, float)
+
+    def serialize(value):
+        if isinstance(value, bool):
+            raise exceptions.ArgumentError(f'Argument "{argument_name}" must be a number ({data_type}).', argument_name)
+
+        try:
+            number = float(value)
+        except (TypeError, ValueError, OverflowError):
+            raise exceptions.ArgumentError(f'Argument "{argument_name}" must be a number ({data_type}).', argument_name)
+
+        # NaN would pass any range check since its comparisons are always False
+        if not math.isfinite(number):
+            raise exceptions.ArgumentError(
+                f'Argument "{argument_name}" must be a finite number ({data_type}).', argument_name
+            )
+
+        if (minimum is not None and number < minimum) or (maximum is not None and number > maximum):
+            raise exceptions.ArgumentError(
+                f'Argument "{argument_name}" must be between {minimum} and {maximum}.', argument_name
+            )
+
+        return str(number)
+
+    return serialize
+
+
+def _compile_boolean_serializer(argument_name):
+    def serialize(value):
+        try:
+            return _BOOLEAN_VALUES[str(int(value)) if isinstance(value, (bool, int)) else str(value).lower()]
+        except KeyError:
+            raise exceptions.ArgumentError(f'Argument "{argument_name}" must be a boolean.', argument_name)
+
+    return serialize
+
+
+def _compile_allowed_values_serializer(argument_name, allowed_value_list):
+    allowed_values = frozenset(allowed_value_list)
+
+    def serialize(value):
+        value = str(value)
+
+        if value not in allowed_values:
+            raise exceptions.ArgumentError(
+                f'Argument "{argument_name}" must be one of: {", ".join(allowed_value_list)}.', argument_name
+            )
+
+        return escape(value)
+
+    return serialize
+
+
+def _serialize_string(value):
+    return escape(str(value))
+
+
+def compile_serializer(argument_name, state_variable):
+
+    """
+        **Compile the serializer for an action argument**
+
+        The serializer validates a value against the data type, ``allowedValueRange`` and ``allowedValueList`` of the
+        argument's related state variable and returns its escaped text for the SOAP request. Invalid values raise an
+        :class:`upnpy.exceptions.ArgumentError`.
+
+        :param argument_name: Name of the argument
+        :type argument_name: str
+        :param state_variable: Related state variable of the argument, values are only escaped if it isn't known
+        :type state_variable: SSDPDevice.Service.StateVariable
+        :return: Function converting a value to the text to send
+        :rtype: callable
+    """
+
+    if state_variable is None:
+        return _serialize_string
+
+    data_type = state_variable.data_type
+
+    if state_variable.allowed_value_list:
+        return _compile_allowed_values_serializer(argument_name, state_variable.allowed_value_list)
+    elif data_type in INTEGER_RANGES:
+        return _compile_integer_serializer(argument_name, data_type, state_variable.allowed_value_range)
+    elif data_type in FLOAT_TYPES:
+        return _compile_float_serializer(argument_name, data_type, state_variable.allowed_value_range)
+    elif data_type == 'boolean':
+        return _compile_boolean_serializer(argument_name)
+
+    return _serialize_string
+
+
+def _parse_date_time(value):
+
+    """
+    Parse an ISO 8601 date, time or date and time value as used by the UPnP date and time types.
+    """
+
+    match = _DATE_TIME_PATTERN.match(value.strip())
+    if match is None:
+        raise ValueError(value)
+
+    year, month, day, hour, minute, second, fraction, offset = match.groups()
+    if year is None and hour is None:
+        raise ValueError(value)
+
+    timezone = None
+    if offset == 'Z':
+        timezone = datetime.timezone.utc
+    elif offset is not None:
+        offset = offset.replace(':', '')
+        delta = datetime.timedelta(hours=int(offset[1:3]), minutes=int(offset[3:5]))
+        timezone = datetime.timezone(-delta if offset[0] == '-' else delta)
+
+    microsecond = int(fraction.ljust(6, '0')) if fraction else 0
+
+    if year is None:
+        return datetime.time(int(hour), int(minute), int(second), microsecond, timezone)
+    if hour is None:
+        return datetime.date(int(year), int(month), int(day))
+    return datetime.datetime(
+        int(year), int(month), int(day), int(hour), int(minute), int(second), microsecond, timezone
+    )
+
+
+def _parse_boolean(value):
+    value = value.strip().lower()
+
+    if value not in _BOOLEAN_VALUES:
+        raise ValueError(value)
+    return _BOOLEAN_VALUES[value] == '1'
+
+
+def _parse_base64(value):
+    return base64.b64decode(value.strip(), validate=True)
+
+
+def _parse_hex(value):
+    return bytes.fromhex(value.strip())
+
+
+def _get_parser(data_type):
+    if data_type in INTEGER_RANGES:
+        return int
+    elif data_type in FLOAT_TYPES:
+        return float
+    elif data_type == 'boolean':
+        return _parse_boolean
+    elif data_type in DATE_TYPES:
+        return _parse_date_time
+    elif data_type == 'bin.base64':
+        return _parse_base64
+    elif data_type == 'bin.hex':
+        return _parse_hex
+    return None
+
+
+def compile_converter(state_variable):
+
+    """
+        **Compile the converter for a returned value**
+
+        The converter turns the text of an out argument into a Python value according to the data type of its related
+        state variable: integers for ``ui1`` to ``ui8`` and ``i1`` to ``i8``, floats for the floating point types,
+        booleans, ``datetime`` objects for the date and time types and bytes for ``bin.base64`` and ``bin.hex``.
+        Empty values of these types are converted to None. Values that don't match their data type, as well as
+        values of any other type, are returned as text.
+
+        :param state_variable: Related state variable of the out argument
+        :type state_variable: SSDPDevice.Service.StateVariable
+        :return: Function converting the text of a returned value
+        :rtype: callable
+    """
+
+    parse = _get_parser(state_variable.data_type if state_variable is not None else None)
+
+    if parse is None:
+        return str
+
+    def convert(value):
+        if not value:
+            return None
+
+        try:
+            return parse(value)
+        except (ValueError, binascii.Error):
+            return value
+
+    return convert
+
+
+def compile_result_converter(action_name, arguments, state_variables):
+
+    """
+        **Compile the converter for the results of an action**
+
+        :param action_name: Name of the action
+        :type action_name: str
+        :param arguments: Out arguments of the action
+        :type arguments: list
+        :param state_variables: State variables of the service by name
+        :type state_variables: dict
+        :return: Function converting the dictionary returned by :func:`upnpy.soap.SOAP.send` into a named tuple with
+                 a field for every out argument, arguments the device didn't return are None
+        :rtype: callable
+    """
+
+    # rename only fixes the field names, vendor actions like X_AVM-DE_GetInfo aren't valid type names either
+    type_name = _INVALID_IDENTIFIER_CHARACTERS.sub('_', f'{action_name}Result')
+    if type_name[0].isdigit():
+        type_name = '_' + type_name
+
+    result_type = collections.namedtuple(type_name, [argument.name for argument in arguments], rename=True)
+    converters = [
+        (argument.name, compile_converter(state_variables.get(argument.related_state_variable)))
+        for argument in arguments
+    ]
+
+    def convert(return_arguments):
+        values = []
+
+        for argument_name, converter in converters:
+            value = return_arguments.get(argument_name)
+            values.append(None if value is None else converter(value))
+
+        return result_type._make(values)
+
+    return convert
@@ -0,0 +1,208 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+
+from upnpy.soap import SOAP
+
+
+# Actions with these prefixes only read state by UPnP naming convention, all other actions invalidate the cache
+READ_ONLY_PREFIXES = ('Get', 'Query')
+
+
+class ResultCache:
+
+    """
+        **Cache for the results of the read-only actions of a service**
+
+        Created by :meth:`SSDPDevice.Service.Action.cache_results`. Results are cached by action and arguments for the
+        TTL of their action. Concurrent identical calls are collapsed into a single request whose result all callers
+        receive. Calling any other action of the service that isn't read-only (see ``READ_ONLY_PREFIXES``), or
+        receiving an event of the service, drops all cached results since they may be outdated.
+    """
+
+    def __init__(self):
+        self.ttls = {}
+        self._lock = threading.Lock()
+        self._results = {}
+        self._pending_calls = {}
+        self._generation = 0
+
+    def set_ttl(self, action_name, ttl):
+
+        """
+            **Set the time results of an action are cached for**
+
+            :param action_name: Name of the action
+            :type action_name: str
+            :param ttl: Time in seconds, caching is disabled for the action if it is None or 0
+            :type ttl: float
+        """
+
+        with self._lock:
+            if ttl:
+                self.ttls[action_name] = ttl
+            else:
+                self.ttls.pop(action_name, None)
+
+            self._results = {key: result for key, result in self._results.items() if key[0] != action_name}
+
+    def invalidate(self):
+
+        """
+            **Drop all cached results**
+
+            Results of calls that are still in progress won't be cached either.
+        """
+
+        with self._lock:
+            self._generation += 1
+            self._results.clear()
+
+    def call(self, action, arguments):
+
+        """
+            **Execute an action through the cache**
+
+            :param action: The action to execute
+            :type action: SSDPDevice.Service.Action
+            :param arguments: Arguments for the action
+            :type arguments: dict
+            :return: Response from the device's service after executing the action, or the cached response
+            :rtype: dict
+        """
+
+        if action.name not in self.ttls:
+            return self._call_uncached(action, arguments)
+
+        key = _get_key(action.name, arguments)
+        if key is None:
+            return SOAP.send(action.service, action, **arguments)
+
+        result, pending_call, generation = self._start_call(key)
+
+        if result is not None:
+            return dict(result)
+        if generation is None:
+            return dict(pending_call.result())
+
+        try:
+            result = SOAP.send(action.service, action, **arguments)
+        except BaseException as e:
+            self._fail_call(key, pending_call, e)
+            raise
+
+        self._finish_call(key, pending_call, generation, result)
+        return dict(result)
+
+    async def call_async(self, action, arguments):
+
+        """
+            **Execute an action through the cache from a coroutine**
+
+            Calls from threads and coroutines are collapsed with each other.
+
+            :param action: The action to execute
+            :type action: SSDPDevice.Service.Action
+            :param arguments: Arguments for the action
+            :type arguments: dict
+            :return: Response from the device's service after executing the action, or the cached response
+            :rtype: dict
+        """
+
+        if action.name not in self.ttls:
+            return await self._call_uncached_async(action, arguments)
+
+        key = _get_key(action.name, arguments)
+        if key is None:
+            return await SOAP.send_async(action.service, action, **arguments)
+
+        result, pending_call, generation = self._start_call(key)
+
+        if result is not None:
+            return dict(result)
+        if generation is None:
+            return dict(await asyncio.wrap_future(pending_call))
+
+        try:
+            result = await SOAP.send_async(action.service, action, **arguments)
+        except BaseException as e:
+            self._fail_call(key, pending_call, e)
+            raise
+
+        self._finish_call(key, pending_call, generation, result)
+        return dict(result)
+
+    def _call_uncached(self, action, arguments):
+        if action.name.startswith(READ_ONLY_PREFIXES):
+            return SOAP.send(action.service, action, **arguments)
+
+        # Invalidate before as well, so that reads already in progress don't cache the state from before the change
+        self.invalidate()
+        try:
+            return SOAP.send(action.service, action, **arguments)
+        finally:
+            self.invalidate()
+
+    async def _call_uncached_async(self, action, arguments):
+        if action.name.startswith(READ_ONLY_PREFIXES):
+            return await SOAP.send_async(action.service, action, **arguments)
+
+        self.invalidate()
+        try:
+            return await SOAP.send_async(action.service, action, **arguments)
+        finally:
+            self.invalidate()
+
+    def _start_call(self, key):
+
+        """
+        Get the cached result for a key, or the call in progress for it, or register a new call.
+        Returns the result, the pending call and the cache generation if the caller has to make the call itself.
+        """
+
+        with self._lock:
+            cached_result = self._results.get(key)
+            if cached_result is not None:
+                if cached_result[0] > time.monotonic():
+                    return cached_result[1], None, None
+                del self._results[key]
+
+            pending_call = self._pending_calls.get(key)
+            if pending_call is not None:
+                return None, pending_call, None
+
+            pending_call = concurrent.futures.Future()
+            self._pending_calls[key] = pending_call
+            return None, pending_call, self._generation
+
+    def _finish_call(self, key, pending_call, generation, result):
+        with self._lock:
+            del self._pending_calls[key]
+
+            # Results of calls that overlapped an invalidation may be outdated
+            if generation == self._generation:
+                self._results[key] = (time.monotonic() + self.ttls.get(key[0], 0), result)
+
+        pending_call.set_result(result)
+
+    def _fail_call(self, key, pending_call, exception):
+        with self._lock:
+            del self._pending_calls[key]
+
+        pending_call.set_exception(exception)
+
+
+def _get_key(action_name, arguments):
+
+    """
+    Get the cache key for a call, or None if the arguments can't be used as a key.
+    """
+
+    key = (action_name, tuple(sorted(arguments.items())))
+
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
@@ -1,37 +1,180 @@
-import urllib.parse
 import urllib.error
-from xml.dom import minidom
-from xml.etree.ElementTree import Element, SubElement, tostring
-import re
+from xml.etree.ElementTree import ParseError
+from xml.sax.saxutils import escape
 
 import upnpy.utils as utils
+from upnpy import async_http
+from upnpy.soap import DataTypes
 from upnpy import exceptions
 
 
-def _substitute_newlines_with_space(match):
-    s, e = match.span()
-    return match.string[s:e].replace('\n', ' ')
+_ENVELOPE_START = '<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/" ' \
+                  's:encodingStyle="http://schemas.xmlsoap.org/soap/encoding/"><s:Body>'
+_ENVELOPE_END = '</s:Body></s:Envelope>'
+_ATTRIBUTE_ENTITIES = {'"': '&quot;', '\n': '&#10;'}
+
+
+class RequestTemplate:
+
+    """
+        **Precompiled SOAP request for an action**
+
+        Holds the parts of an action's SOAP envelope and headers that are the same for every invocation, so invoking
+        the action only has to fill in the argument values. Every in argument gets a serializer compiled from its
+        related state variable (see :func:`upnpy.soap.DataTypes.compile_serializer`), so invalid values are rejected
+        locally before anything is sent to the device.
+
+        :param service_type: Full service string (e.g.: ``urn:schemas-upnp-org:service:WANIPConnection:1``)
+        :type service_type: str
+        :param action: The action to compile the request for
+        :type action: SSDPDevice.Service.Action
+        :param state_variables: State variables of the service by name
+        :type state_variables: dict
+    """
+
+    def __init__(self, service_type, action, state_variables=None):
+        self._envelope_start = f'{_ENVELOPE_START}<u:{action.name} ' \
+                               f'xmlns:u="{escape(service_type, _ATTRIBUTE_ENTITIES)}">'
+        self._envelope_end = f'</u:{action.name}>{_ENVELOPE_END}'
+        self._action_name = action.name
+        self._arguments = [
+            (
+                argument.name,
+                f'<{argument.name}>',
+                f'</{argument.name}>',
+                DataTypes.compile_serializer(
+                    argument.name, (state_variables or {}).get(argument.related_state_variable)
+                )
+            )
+            for argument in action.args_in
+        ]
+        self._argument_names = frozenset(argument[0] for argument in self._arguments)
+
+        self.headers = {
+            'Content-Type': 'text/xml; charset="utf-8"',
+            'SOAPAction': f'"{service_type}#{action.name}"'
+        }
+
+    def render(self, action_arguments):
+
+        """
+            **Validate and fill in the argument values**
+
+            :param action_arguments: Values for all in arguments of the action
+            :type action_arguments: dict
+            :return: SOAP request body
+            :rtype: bytes
+        """
+
+        soap_body = [self._envelope_start]
+        missing_arguments = []
+
+        for argument_name, element_start, element_end, serialize in self._arguments:
+            try:
+                value = action_arguments[argument_name]
+            except KeyError:
+                missing_arguments.append(argument_name)
+                continue
+
+            soap_body.append(element_start)
+            soap_body.append(serialize(value))
+            soap_body.append(element_end)
+
+        if missing_arguments:
+            raise exceptions.ArgumentError(f'Missing arguments for action "{self._action_name}".', missing_arguments)
+
+        if len(action_arguments) != len(self._arguments):
+            for argument in action_arguments:
+                if argument not in self._argument_names:
+                    raise exceptions.ArgumentError(
+                        f'This service does not accept the "in" argument "{argument}".', argument
+                    )
+
+        soap_body.append(self._envelope_end)
+
+        # Characters outside of ASCII are sent as character references
+        return ''.join(soap_body).encode('ascii', 'xmlcharrefreplace')
 
 
 def _parse_response(response, action_name):
-    response = response.read().decode()
 
-    response = re.sub('(?<=>)[\\s\\t\\n]+(?=<)', '', response)
-    response = re.sub('<[^<>]+>', _substitute_newlines_with_space, response)
+    """
+    Extract the out arguments from the <actionNameResponse> element of a SOAP response in a single pass, the rest of
+    the response is not looked at. Responses that aren't well-formed XML raise a SOAPError like faults do.
+    """
+
+    response_tag = action_name + 'Response'
+    return_arguments = None
+    depth = 0
+
+    try:
+        for event, tag, element in utils.iterparse_xml(response.read()):
+            if return_arguments is None:
+                if event == 'start' and tag == response_tag:
+                    return_arguments = {}
+            elif event == 'start':
+                depth += 1
+            elif depth == 0:
+                return return_arguments
+            else:
+                depth -= 1
+
+                # Only direct children of the response element are out arguments
+                if depth == 0:
+                    text = element.text
+                    return_arguments[tag] = text if text and not text.isspace() else ''
+                    element.clear()
+    except ParseError:
+        raise exceptions.SOAPError(f'Malformed response for action "{action_name}" received.', None)
 
-    return_arguments = {}
+    raise exceptions.SOAPError(f'No response for action "{action_name}" received.', None)
 
-    xml_root = minidom.parseString(response)
-    xml_response_arguments = xml_root.getElementsByTagNameNS('*', 'Body')[0] \
-        .getElementsByTagNameNS('*', action_name + 'Response')[0]
 
-    for return_argument in xml_response_arguments.childNodes:
-        if return_argument.firstChild is None:
-            return_arguments[return_argument.tagName] = ''
-        else:
-            return_arguments[return_argument.tagName] = return_argument.firstChild.nodeValue
+def _get_soap_error(error):
 
-    return return_arguments
+    """
+    Convert the HTTP error received for a SOAP request into a SOAPError. The UPnPError fields of a fault are
+    extracted in a single pass.
+    """
+
+    if error.code != 500:
+        return exceptions.SOAPError('Unknown response code received.', error.code)
+
+    error_code = None
+    error_description = ''
+
+    try:
+        for event, tag, element in utils.iterparse_xml(error.read()):
+            if event != 'end':
+                continue
+
+            if tag == 'errorCode' and element.text and element.text.strip().isdigit():
+                error_code = int(element.text)
+            elif tag == 'errorDescription':
+                error_description = element.text or ''
+            elif tag == 'UPnPError':
+                break
+    except ParseError:
+        # Malformed faults are reported like faults without a UPnPError, unless the error code could be read
+        pass
+
+    if error_code is None:
+        return exceptions.SOAPError('Unknown response code received.', error.code)
+    return exceptions.SOAPError(error_description, error_code)
+
+
+def _build_request(service, action, **action_arguments):
+
+    """
+    Validate the action arguments and build the control URL, body and headers of the SOAP request.
+    """
+
+    soap_body = action.request_template.render(action_arguments)
+
+    headers = {'Host': service._netloc, 'Content-Length': len(soap_body)}
+    headers.update(action.request_template.headers)
+
+    return service._full_control_url, soap_body, headers
 
 
 def send(service, action, **action_arguments):
@@ -69,71 +212,33 @@ def send(service, action, **action_arguments):
 
     """
 
-    args_in = action.args_in
-
-    if not all(arg.name in action_arguments.keys() for arg in args_in):
-
-        missing_arguments = []
+    full_control_url, soap_body, headers = _build_request(service, action, **action_arguments)
 
-        for argument in action.args_in:
-            if argument.name not in action_arguments.keys():
-                missing_arguments.append(argument.name)
-
-        raise exceptions.ArgumentError(
-            f'Missing arguments for action "{action.name}".',
-            missing_arguments
-        )
-
-    for argument in action_arguments.keys():
-        in_argument_names = [arg.name for arg in args_in]
-        if argument not in in_argument_names:
-            raise exceptions.ArgumentError(f'This service does not accept the "in" argument "{argument}".', argument)
-
-    xml_root = Element('s:Envelope')
-    xml_root.set('xmlns:s', 'http://schemas.xmlsoap.org/soap/envelope/')
-    xml_root.set('s:encodingStyle', 'http://schemas.xmlsoap.org/soap/encoding/')
-
-    xml_body = SubElement(xml_root, 's:Body')
+    try:
+        with utils.get_request_scheduler().request(service.base_url):
+            response = utils.make_http_request(full_control_url, data=soap_body, headers=headers)
+        return _parse_response(response, action.name)
+    except urllib.error.HTTPError as e:
+        raise _get_soap_error(e)
 
-    xml_action_name = SubElement(xml_body, f'u:{action.name}')
-    xml_action_name.set('xmlns:u', service.service)
 
-    for argument in action.arguments:
-        try:
-            argument_value = action_arguments[argument.name]
-        except KeyError:
-            continue
+async def send_async(service, action, **action_arguments):
 
-        xml_action_name_argument = SubElement(xml_action_name, argument.name)
-        xml_action_name_argument.text = str(argument_value)
+    """
+        **Send a SOAP request from a coroutine**
 
-    soap_body = tostring(xml_root, short_empty_elements=False)
+        Asynchronous version of :func:`send` which doesn't block the event loop while waiting for the device.
 
-    headers = {
-        'Host': f'{urllib.parse.urlparse(service.base_url).netloc}',
-        'Content-Length': len(soap_body),
-        'Content-Type': 'text/xml; charset="utf-8"',
-        'SOAPAction': f'"{service.service}#{action.name}"'
-    }
+        :param service: DeviceService object
+        :param action: SOAPAction object
+        :return: Request response data
+    """
 
-    full_control_url = service.base_url + service.control_url
+    full_control_url, soap_body, headers = _build_request(service, action, **action_arguments)
 
     try:
-        return _parse_response(
-            utils.make_http_request(full_control_url, data=soap_body, headers=headers),
-            action.name
-        )
+        async with utils.get_request_scheduler().request_async(service.base_url):
+            response = await async_http.make_http_request(full_control_url, data=soap_body, headers=headers)
+        return _parse_response(response, action.name)
     except urllib.error.HTTPError as e:
-        if e.code == 500:
-            response = e.read().decode()
-            xml_root = minidom.parseString(response)
-            error_code = xml_root.getElementsByTagName('errorCode')[0].firstChild.nodeValue
-            xml_error_description = xml_root.getElementsByTagName('errorDescription')[0].firstChild
-
-            if xml_error_description is None:
-                error_description = ''
-            else:
-                error_description = xml_error_description.nodeValue
-            raise exceptions.SOAPError(error_description, int(error_code))
-        else:
-            raise exceptions.SOAPError('Unknown response code received.', e.code)
+        raise _get_soap_error(e)
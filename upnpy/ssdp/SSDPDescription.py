@@ -0,0 +1,139 @@
+import upnpy.utils as utils
+
+
+_DEVICE_SERVICE_FIELDS = {
+    'serviceType': 'service',
+    'serviceId': 'service_id',
+    'SCPDURL': 'scpd_url',
+    'controlURL': 'control_url',
+    'eventSubURL': 'event_sub_url'
+}
+
+
+def _get_text(element):
+    if element.text is None:
+        return None
+    return element.text.strip()
+
+
+def parse_device_description(description):
+
+    """
+        **Parse a device description**
+
+        Extracts the root device's details and the services of the root device and all of its embedded devices
+        in a single pass over the description.
+
+        :param description: Device description XML
+        :type description: bytes or str
+        :return: Dictionary with the ``friendly_name``, ``device_type``, ``url_base`` and ``services`` of the device
+        :rtype: dict
+    """
+
+    parsed_description = {
+        'friendly_name': None,
+        'device_type': None,
+        'url_base': None,
+        'services': []
+    }
+
+    device_depth = 0
+    service = None
+
+    for event, tag, element in utils.iterparse_xml(description):
+        if event == 'start':
+            if tag == 'device':
+                device_depth += 1
+            elif tag == 'service':
+                service = {}
+            continue
+
+        if tag == 'device':
+            device_depth -= 1
+        elif service is not None:
+            if tag == 'service':
+                parsed_description['services'].append(service)
+                service = None
+            elif tag in _DEVICE_SERVICE_FIELDS:
+                service[_DEVICE_SERVICE_FIELDS[tag]] = _get_text(element)
+        elif device_depth == 1 and tag == 'friendlyName':
+            parsed_description['friendly_name'] = _get_text(element)
+        elif device_depth == 1 and tag == 'deviceType':
+            parsed_description['device_type'] = _get_text(element)
+        elif device_depth == 0 and tag == 'URLBase':
+            parsed_description['url_base'] = _get_text(element)
+
+        # Drop the contents of every element once it has been handled to keep memory usage flat
+        if tag in ('service', 'device'):
+            element.clear()
+
+    return parsed_description
+
+
+def parse_service_description(description):
+
+    """
+        **Parse a service description (SCPD)**
+
+        Extracts the actions and state variables of a service in a single pass over the description.
+
+        :param description: Service description XML
+        :type description: bytes or str
+        :return: Tuple of the list of actions and the list of state variables
+        :rtype: tuple
+    """
+
+    actions = []
+    state_variables = []
+
+    action = None
+    argument = None
+    state_variable = None
+
+    for event, tag, element in utils.iterparse_xml(description):
+        if event == 'start':
+            if tag == 'action':
+                action = {'name': None, 'arguments': []}
+            elif tag == 'argument' and action is not None:
+                argument = {'name': None, 'direction': None, 'return_value': None, 'related_state_variable': None}
+            elif tag == 'stateVariable':
+                state_variable = {'name': None, 'data_type': None, 'allowed_value_list': [], 'allowed_value_range': None}
+            continue
+
+        if argument is not None:
+            if tag == 'argument':
+                action['arguments'].append(argument)
+                argument = None
+            elif tag == 'name':
+                argument['name'] = _get_text(element)
+            elif tag == 'direction':
+                argument['direction'] = _get_text(element)
+            elif tag == 'retval':
+                # The <retval/> element is a flag, mark its presence with an empty string
+                argument['return_value'] = _get_text(element) or ''
+            elif tag == 'relatedStateVariable':
+                argument['related_state_variable'] = _get_text(element)
+        elif action is not None:
+            if tag == 'action':
+                actions.append(action)
+                action = None
+                element.clear()
+            elif tag == 'name':
+                action['name'] = _get_text(element)
+        elif state_variable is not None:
+            if tag == 'stateVariable':
+                state_variables.append(state_variable)
+                state_variable = None
+                element.clear()
+            elif tag == 'name':
+                state_variable['name'] = _get_text(element)
+            elif tag == 'dataType':
+                state_variable['data_type'] = _get_text(element)
+            elif tag == 'allowedValue':
+                state_variable['allowed_value_list'].append(_get_text(element))
+            elif tag in ('minimum', 'maximum', 'step'):
+                if state_variable['allowed_value_range'] is None:
+                    state_variable['allowed_value_range'] = {}
+                state_variable['allowed_value_range'][tag] = _get_text(element)
+
+    return actions, state_variables
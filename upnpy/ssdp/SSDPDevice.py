@@ -1,10 +1,17 @@
 from urllib.parse import urlparse
-from xml.dom import minidom
 from functools import wraps
+import hashlib
+import sys
+import threading
 import urllib.error
+import weakref
 
 import upnpy.utils as utils
 from upnpy.soap import SOAP
+from upnpy.soap import DataTypes
+from upnpy.soap.ResultCache import ResultCache
+from upnpy.ssdp import SSDPDescription
+from upnpy.ssdp.SSDPResponse import SSDPHeaders, parse_headers
 from upnpy import exceptions
 
 
@@ -32,14 +39,44 @@ def _service_description_required(func):
 
     @wraps(func)
     def wrapper(service, *args, **kwargs):
-        if service.description is None:
+        if service._description is None:
             raise exceptions.NotRetrievedError('No service description retrieved for this service.')
-        elif service.description == exceptions.NotAvailableError:
+        elif service._description == exceptions.NotAvailableError:
             return
         return func(service, *args, **kwargs)
     return wrapper
 
 
+# Parsed service descriptions by service type and SCPD digest, shared by all services with an identical SCPD
+_service_schemas = weakref.WeakValueDictionary()
+_service_schemas_lock = threading.Lock()
+
+
+def _intern(name):
+    return sys.intern(name) if name is not None else None
+
+
+def _get_service_schema(service_type, description):
+
+    """
+    Get the schema for a service description, it is only parsed if no other service with the same type and
+    description exists. Schemas are dropped once the last service using them is gone.
+    """
+
+    key = (service_type, hashlib.sha1(description.encode('utf-8')).digest())
+
+    with _service_schemas_lock:
+        schema = _service_schemas.get(key)
+    if schema is not None:
+        return schema
+
+    schema = SSDPDevice.Service.Schema(service_type, description)
+
+    # Another service may have parsed the same description in the meantime, keep the schema that was stored first
+    with _service_schemas_lock:
+        return _service_schemas.setdefault(key, schema)
+
+
 def _base_url_required(func):
 
     """
@@ -65,26 +102,53 @@ class SSDPDevice:
         :param address: SSDP device address
         :type address: tuple
         :param response: Device discovery response data
-        :type response: str
+        :type response: bytes or str
+        :param executor: Optional executor used to retrieve the service descriptions concurrently
+        :type executor: concurrent.futures.Executor
+        :param lazy: Only retrieve a service's description once its actions or state variables are accessed
+        :type lazy: bool
+        :param cache: Optional persistent cache for the device and service descriptions
+        :type cache: upnpy.cache.DescriptionCache
+        :param description: Device description retrieved beforehand, it won't be requested from the device if set
+        :type description: bytes
+        :param interface: Address of the local interface the device was discovered on
+        :type interface: str
+        :param headers: Headers of the response if they have been parsed already
+        :type headers: upnpy.ssdp.SSDPResponse.SSDPHeaders
     """
 
-    def __init__(self, address, response):
+    def __init__(self, address, response, executor=None, lazy=False, cache=None, description=None, interface=None,
+                 headers=None):
+        if headers is None:
+            headers = parse_headers(response) or SSDPHeaders()
+        if isinstance(response, bytes):
+            response = response.decode('utf-8', 'replace')
+
         self.address = address
         self.host = address[0]
         self.port = address[1]
         self.response = response
+        self.headers = headers
+        self.interface = interface
         self.description = None
         self.friendly_name = None
         self.type_ = None
         self.base_url = None
         self.services = {}
         self.selected_service = None
+        self.usn = headers.get('usn')
+        self.boot_id = headers.get('bootid.upnp.org')
+        self.config_id = headers.get('configid.upnp.org')
+        self._executor = executor
+        self._lazy = lazy
+        self._cache = cache
 
-        self._get_description_request(utils.parse_http_header(response, 'Location'))
-        self._get_friendly_name_request()
-        self._get_type_request()
-        self._get_base_url_request()
-        self._get_services_request()
+        if description is None:
+            self._get_description_request(headers.get('location'))
+        else:
+            self.description = description
+
+        self._parse_description_request()
 
     def get_services(self):
 
@@ -114,7 +178,10 @@ class SSDPDevice:
 
     def _get_description_request(self, url):
         try:
-            device_description = utils.make_http_request(url).read()
+            if self._cache is not None:
+                device_description = self._cache.fetch(url, self.boot_id, self.config_id)
+            else:
+                device_description = utils.make_http_request(url).read()
             self.description = device_description
             return device_description.decode()
 
@@ -123,32 +190,32 @@ class SSDPDevice:
             return None
 
     @_device_description_required
-    def _get_friendly_name_request(self):
-        root = minidom.parseString(self.description)
-        device_friendly_name = root.getElementsByTagName('friendlyName')[0].firstChild.nodeValue
-        self.friendly_name = device_friendly_name
-        return self.friendly_name
+    def _parse_description_request(self):
 
-    @_device_description_required
-    def _get_type_request(self):
-        root = minidom.parseString(self.description)
-        device_type = root.getElementsByTagName('deviceType')[0].firstChild.nodeValue
-        self.type_ = device_type
-        return self.type_
+        """
+        Parse the device description in a single pass and populate the device's details and services.
+        """
+
+        parsed_description = SSDPDescription.parse_device_description(self.description)
+
+        self.friendly_name = parsed_description['friendly_name']
+        self.type_ = parsed_description['device_type']
+        self._get_base_url_request(parsed_description['url_base'])
+        self._get_services_request(parsed_description['services'])
 
     @_device_description_required
-    def _get_base_url_request(self):
-        location_header_value = utils.parse_http_header(self.response, 'Location')
+    def _get_base_url_request(self, url_base=None):
+        location_header_value = self.headers.get('location')
         header_url = urlparse(location_header_value)
-        root = minidom.parseString(self.description)
-        try:
-            parsed_url = urlparse(root.getElementsByTagName('URLBase')[0].firstChild.nodeValue)
+
+        if url_base:
+            parsed_url = urlparse(url_base)
 
             if parsed_url.port is not None:
                 base_url = f'{parsed_url.scheme}://{parsed_url.netloc}'
             else:
                 base_url = f'{parsed_url.scheme}://{parsed_url.netloc}:{header_url.port}'
-        except (IndexError, AttributeError):
+        else:
             base_url = f'{header_url.scheme}://{header_url.netloc}'
 
         self.base_url = base_url
@@ -156,33 +223,42 @@ class SSDPDevice:
 
     @_device_description_required
     @_base_url_required
-    def _get_services_request(self):
+    def _get_services_request(self, services):
         if not self.services:
-            device_services = {}
-            root = minidom.parseString(self.description)
+            services_arguments = {}
 
             base_url = self.base_url
 
-            for service in root.getElementsByTagName('service'):
-                service_string = service.getElementsByTagName('serviceType')[0].firstChild.nodeValue
-                service_id = service.getElementsByTagName('serviceId')[0].firstChild.nodeValue
-                scpd_url = service.getElementsByTagName('SCPDURL')[0].firstChild.nodeValue
-                control_url = service.getElementsByTagName('controlURL')[0].firstChild.nodeValue
-                event_sub_url = service.getElementsByTagName('eventSubURL')[0].firstChild.nodeValue
+            for service in services:
+                service_string = service.get('service')
+                service_id = service.get('service_id')
+                scpd_url = service.get('scpd_url')
+                control_url = service.get('control_url')
+                event_sub_url = service.get('event_sub_url')
 
                 parsed_service_id = utils.parse_service_id(service_id)
 
-                if parsed_service_id not in device_services.keys():
-                    device_services[parsed_service_id] = self.Service(
-                        service=service_string,
-                        service_id=service_id,
-                        scpd_url=scpd_url,
-                        control_url=control_url,
-                        event_sub_url=event_sub_url,
-                        base_url=base_url
-                    )
+                if parsed_service_id not in services_arguments.keys():
+                    services_arguments[parsed_service_id] = {
+                        'service': service_string,
+                        'service_id': service_id,
+                        'scpd_url': scpd_url,
+                        'control_url': control_url,
+                        'event_sub_url': event_sub_url,
+                        'base_url': base_url,
+                        'lazy': self._lazy,
+                        'cache': self._cache,
+                        'boot_id': self.boot_id,
+                        'config_id': self.config_id
+                    }
+
+            # Each service retrieves its own SCPD on creation, so fetch them concurrently when possible
+            if self._executor is not None and not self._lazy:
+                device_services = self._executor.map(lambda kwargs: self.Service(**kwargs), services_arguments.values())
+            else:
+                device_services = (self.Service(**kwargs) for kwargs in services_arguments.values())
 
-            self.services = device_services
+            self.services = dict(zip(services_arguments.keys(), device_services))
 
         return self.services
 
@@ -242,9 +318,25 @@ class SSDPDevice:
             :type event_sub_url: str
             :param base_url: Base URL of the service
             :type base_url: str
+            :param lazy: Defer retrieving the service description until its actions or state variables are accessed
+            :type lazy: bool
+            :param cache: Optional persistent cache for the service description
+            :type cache: upnpy.cache.DescriptionCache
+            :param boot_id: ``BOOTID.UPNP.ORG`` value announced by the device, used to validate cached descriptions
+            :type boot_id: str
+            :param config_id: ``CONFIGID.UPNP.ORG`` value announced by the device, used to validate cached descriptions
+            :type config_id: str
         """
 
-        def __init__(self, service, service_id, scpd_url, control_url, event_sub_url, base_url):
+        def __init__(self, service, service_id, scpd_url, control_url, event_sub_url, base_url, lazy=False,
+                     cache=None, boot_id=None, config_id=None):
+
+            # Set up the backing attributes first since __getattr__ resolves the lazy properties below
+            self._description = None
+            self._actions = {}
+            self._state_variables = {}
+            self._description_retrieved = False
+            self._description_lock = threading.Lock()
 
             parsed_base_url = urlparse(base_url)
             parsed_scpd_url = urlparse(scpd_url)
@@ -280,13 +372,86 @@ class SSDPDevice:
             self.control_url = control_url
             self.event_sub_url = event_sub_url
             self.base_url = base_url
-            self.actions = {}
-            self.description = None
-            self.state_variables = {}
+            self._cache = cache
+            self.result_cache = None
+
+            # Precomputed for action invocation
+            self._full_control_url = base_url + control_url
+            self._full_event_sub_url = base_url + event_sub_url if event_sub_url else None
+            self._netloc = parsed_base_url.netloc
+            self._boot_id = boot_id
+            self._config_id = config_id
+
+            if not lazy:
+                self._retrieve_description()
+
+        @property
+        def description(self):
+
+            """
+                **Service description (SCPD)**
+
+                Retrieved on first access if the service was created lazily.
+            """
+
+            self._retrieve_description()
+            return self._description
+
+        @description.setter
+        def description(self, description):
+            self._description = description
+
+        @property
+        def actions(self):
+
+            """
+                **Actions available for the service**
+
+                Retrieved on first access if the service was created lazily.
+            """
+
+            self._retrieve_description()
+            return self._actions
 
-            self._get_description_request()
-            self._get_state_variables_request()
-            self._get_actions_request()
+        @actions.setter
+        def actions(self, actions):
+            self._actions = actions
+
+        @property
+        def state_variables(self):
+
+            """
+                **State variables of the service**
+
+                Retrieved on first access if the service was created lazily.
+            """
+
+            self._retrieve_description()
+            return self._state_variables
+
+        @state_variables.setter
+        def state_variables(self, state_variables):
+            self._state_variables = state_variables
+
+        def _retrieve_description(self, description=None):
+
+            """
+            Retrieve and parse the service description, unless that has already been done.
+            The description is only requested from the device if it isn't provided.
+            """
+
+            if self._description_retrieved:
+                return
+
+            with self._description_lock:
+                if not self._description_retrieved:
+                    if description is None:
+                        self._get_description_request()
+                    else:
+                        self.description = description
+
+                    self._parse_description_request()
+                    self._description_retrieved = True
 
         def get_actions(self):
 
@@ -316,7 +481,10 @@ class SSDPDevice:
             """
 
             try:
-                service_description = utils.make_http_request(self.scpd_url).read()
+                if self._cache is not None:
+                    service_description = self._cache.fetch(self.scpd_url, self._boot_id, self._config_id)
+                else:
+                    service_description = utils.make_http_request(self.scpd_url).read()
                 self.description = service_description.decode()
             except urllib.error.HTTPError as e:
                 if e.code == 404:
@@ -324,96 +492,30 @@ class SSDPDevice:
                 else:
                     raise
 
-            return self.description
+            return self._description
 
         @_service_description_required
-        def _get_actions_request(self):
+        def _parse_description_request(self):
 
             """
-                **Get the service actions**
+                **Parse the service description**
 
-                Gets the actions available for the service.
+                Services of the same type with identical descriptions share a single :class:`Schema`, so the
+                description is only parsed for the first of them. The service gets its own actions bound to it, which
+                reference the argument lists, state variables and compiled requests of the schema.
 
-                :return: List of actions available for the service
-                :rtype: list
+                :return: Tuple of the actions and state variables available for the service
+                :rtype: tuple
             """
 
-            all_actions = {}
-            service_description = self.description
-
-            root = minidom.parseString(service_description)
-            actions = root.getElementsByTagName('action')
-
-            for action in actions:
-                action_name = action.getElementsByTagName('name')[0].firstChild.nodeValue
-                action_arguments = []
-
-                # An action's argument list is only required if the action has parameters according to UPnP spec
-                try:
-                    action_argument_list = action.getElementsByTagName('argumentList')[0]
-                except IndexError:
-                    action_argument_list = None
-
-                if action_argument_list:
-                    action_arguments_elements = action_argument_list.getElementsByTagName('argument')
+            schema = _get_service_schema(self.service, self._description)
 
-                    for argument in action_arguments_elements:
-                        argument_name = argument.getElementsByTagName('name')[0].firstChild.nodeValue
-                        argument_direction = argument.getElementsByTagName('direction')[0].firstChild.nodeValue
+            # The description text is shared with the schema as well
+            self._description = schema.description
+            self.state_variables = schema.state_variables
+            self.actions = {name: action._bind(self) for name, action in schema.actions.items()}
 
-                        # Argument return value is optional according to UPnP spec
-                        try:
-                            argument_return_value = argument.getElementsByTagName('retval')[0].firstChild.nodeValue
-                        except IndexError:
-                            argument_return_value = None
-
-                        argument_related_state_variable = argument.getElementsByTagName(
-                            'relatedStateVariable'
-                        )[0].firstChild.nodeValue
-
-                        action_arguments.append(
-                            self.Action.Argument(
-                                argument_name,
-                                argument_direction,
-                                argument_return_value,
-                                argument_related_state_variable
-                            )
-                        )
-
-                all_actions[action_name] = self.Action(action_name, action_arguments, self)
-
-            self.actions = all_actions
-            return all_actions
-
-        @_service_description_required
-        def _get_state_variables_request(self):
-
-            service_description = self.description
-
-            root = minidom.parseString(service_description)
-            state_variables = {}
-
-            xml_state_variables = root.getElementsByTagName('stateVariable')
-
-            for state_variable in xml_state_variables:
-                state_variable_name = state_variable.getElementsByTagName('name')[0].firstChild.nodeValue
-                state_variable_data_type = state_variable.getElementsByTagName('dataType')[0].firstChild.nodeValue
-                state_variable_allowed_value_list = []
-
-                xml_allowed_values = state_variable.getElementsByTagName('allowedValue')
-
-                if xml_allowed_values:
-                    for allowed_value in xml_allowed_values:
-                        state_variable_allowed_value_list.append(allowed_value.firstChild.nodeValue)
-
-                state_variables[state_variable_name] = self.StateVariable(
-                    state_variable_name,
-                    state_variable_data_type,
-                    state_variable_allowed_value_list
-                )
-
-            self.state_variables = state_variables
-            return self.state_variables
+            return self._actions, self._state_variables
 
         @staticmethod
         def _get_service_type(service):
@@ -445,6 +547,9 @@ class SSDPDevice:
                 :rtype: dict
             """
 
+            if action_name.startswith('__'):
+                raise AttributeError(action_name)
+
             if self.description == exceptions.NotAvailableError:
                 raise exceptions.NotAvailableError('Can\'t execute actions because a description for this service is'
                                                    ' not available.')
@@ -473,14 +578,25 @@ class SSDPDevice:
                 :type argument_list: list
                 :param service: The service to which this action belongs
                 :type service: SSDPDevice.Service
+                :param schema: Schema the action is part of, if it is created for a :class:`SSDPDevice.Service.Schema`
+                :type schema: SSDPDevice.Service.Schema
+
+                The SOAP request for the action is compiled once when the action is created and kept in
+                ``request_template``. Actions of a schema aren't bound to a service, every service gets a copy of them
+                sharing everything but the ``service``.
             """
 
-            def __init__(self, name, argument_list, service):
+            __slots__ = ('name', 'arguments', 'args_in', 'args_out', 'service', 'request_template', '_schema',
+                         '_result_converter')
+
+            def __init__(self, name, argument_list, service, schema=None):
                 self.name = name
                 self.arguments = argument_list
                 self.args_in = []
                 self.args_out = []
                 self.service = service
+                self._schema = schema
+                self._result_converter = None
 
                 for argument in self.arguments:
                     direction = argument.direction
@@ -494,6 +610,28 @@ class SSDPDevice:
                             argument.name
                         )
 
+                if schema is not None:
+                    self.request_template = SOAP.RequestTemplate(schema.service_type, self, schema.state_variables)
+                else:
+                    self.request_template = SOAP.RequestTemplate(service.service, self, service._state_variables)
+
+            def _bind(self, service):
+
+                """
+                Copy the action for a service, the copy shares the arguments and compiled request of the action.
+                """
+
+                action = object.__new__(type(self))
+                action.name = self.name
+                action.arguments = self.arguments
+                action.args_in = self.args_in
+                action.args_out = self.args_out
+                action.service = service
+                action.request_template = self.request_template
+                action._schema = self._schema
+                action._result_converter = self._result_converter
+                return action
+
             def get_input_arguments(self):
 
                 """
@@ -557,8 +695,91 @@ class SSDPDevice:
                     :rtype: dict
                 """
 
+                if self.service.result_cache is not None:
+                    return self.service.result_cache.call(self, action_kwargs)
                 return SOAP.send(self.service, self, **action_kwargs)
 
+            async def call_async(self, **action_kwargs):
+
+                """
+                    **Execute the action from a coroutine**
+
+                    Executes the action on the service without blocking the event loop.
+
+                    :param action_kwargs: Arguments for this action if any
+                    :type action_kwargs: str, int
+                    :return: Response from the device's service after executing the action
+                    :rtype: dict
+                """
+
+                if self.service.result_cache is not None:
+                    return await self.service.result_cache.call_async(self, action_kwargs)
+                return await SOAP.send_async(self.service, self, **action_kwargs)
+
+            def call_typed(self, **action_kwargs):
+
+                """
+                    **Execute the action and convert its results**
+
+                    Same as calling the action, but the returned values are converted according to the data types of
+                    their related state variables (see :func:`upnpy.soap.DataTypes.compile_converter`).
+
+                    :param action_kwargs: Arguments for this action if any
+                    :type action_kwargs: str, int
+                    :return: Named tuple with a field for every out argument of the action
+                    :rtype: tuple
+                """
+
+                return self._get_result_converter()(self(**action_kwargs))
+
+            async def call_typed_async(self, **action_kwargs):
+
+                """
+                    **Execute the action from a coroutine and convert its results**
+
+                    :param action_kwargs: Arguments for this action if any
+                    :type action_kwargs: str, int
+                    :return: Named tuple with a field for every out argument of the action
+                    :rtype: tuple
+                """
+
+                return self._get_result_converter()(await self.call_async(**action_kwargs))
+
+            def cache_results(self, ttl):
+
+                """
+                    **Cache the results of the action**
+
+                    Opts the action into the result cache of its service (see :class:`upnpy.soap.ResultCache.ResultCache`).
+                    Calls with the same arguments return the cached results until the TTL has passed, concurrent
+                    identical calls only send a single request, and calling an action of the service that changes its
+                    state drops the cached results. Should only be used for actions that don't change the state of the
+                    service.
+
+                    :param ttl: Time in seconds the results are cached for, caching is disabled if it is None or 0
+                    :type ttl: float
+                """
+
+                if self.service.result_cache is None:
+                    self.service.result_cache = ResultCache()
+                self.service.result_cache.set_ttl(self.name, ttl)
+
+            def _get_result_converter(self):
+
+                """
+                Get the converter for the action's results, it is compiled on first use.
+                """
+
+                if self._result_converter is None:
+                    if self._schema is not None:
+                        self._result_converter = self._schema.get_result_converter(self)
+                        return self._result_converter
+
+                    self._result_converter = DataTypes.compile_result_converter(
+                        self.name, self.args_out, self.service._state_variables
+                    )
+                return self._result_converter
+
             def __repr__(self):
                 return f'<Action name="{self.name}">'
 
@@ -578,6 +799,8 @@ class SSDPDevice:
                     :param related_state_variable: Defines the type of the argument
                 """
 
+                __slots__ = ('name', 'direction', 'return_value', 'related_state_variable')
+
                 def __init__(self, name, direction, return_value, related_state_variable):
                     self.name = name
                     self.direction = direction
@@ -585,10 +808,98 @@ class SSDPDevice:
                     self.related_state_variable = related_state_variable
 
         class StateVariable:
-            def __init__(self, name, data_type, allowed_value_list=None):
+
+            __slots__ = ('name', 'data_type', 'allowed_value_list', 'allowed_value_range')
+
+            def __init__(self, name, data_type, allowed_value_list=None, allowed_value_range=None):
                 self.name = name
                 self.data_type = data_type
                 self.allowed_value_list = allowed_value_list
+                self.allowed_value_range = allowed_value_range
 
             def __repr__(self):
                 return f'StateVariable <name="{self.name}">'
+
+        class Schema:
+
+            """
+                **Parsed service description**
+
+                Holds the actions and state variables parsed from a service description (SCPD). Schemas are
+                content-addressed by the service type and a hash of the description, so all services of the same
+                device model share one schema instead of parsing the description and building the actions, arguments
+                and state variables for every device. Names are interned for the same reason.
+
+                :param service_type: Full service string (e.g.: ``urn:schemas-upnp-org:service:WANIPConnection:1``)
+                :type service_type: str
+                :param description: Service description
+                :type description: str
+            """
+
+            __slots__ = ('service_type', 'description', 'state_variables', 'actions', '_result_converters',
+                         '__weakref__')
+
+            def __init__(self, service_type, description):
+                self.service_type = service_type
+                self.description = description
+                self._result_converters = {}
+
+                parsed_actions, parsed_state_variables = SSDPDescription.parse_service_description(description)
+
+                state_variables = {}
+
+                for state_variable in parsed_state_variables:
+                    name = _intern(state_variable['name'])
+                    state_variables[name] = SSDPDevice.Service.StateVariable(
+                        name,
+                        _intern(state_variable['data_type']),
+                        state_variable['allowed_value_list'],
+                        state_variable['allowed_value_range']
+                    )
+
+                # Actions compile their requests from the state variables, so these have to be set first
+                self.state_variables = state_variables
+
+                actions = {}
+
+                for action in parsed_actions:
+                    action_arguments = []
+
+                    for argument in action['arguments']:
+                        action_arguments.append(
+                            SSDPDevice.Service.Action.Argument(
+                                _intern(argument['name']),
+                                _intern(argument['direction']),
+                                argument['return_value'],
+                                _intern(argument['related_state_variable'])
+                            )
+                        )
+
+                    name = _intern(action['name'])
+                    actions[name] = SSDPDevice.Service.Action(name, action_arguments, None, self)
+
+                self.actions = actions
+
+            def get_result_converter(self, action):
+
+                """
+                    **Get the result converter of an action**
+
+                    Converters are compiled once per schema and shared by the actions of all its services (see
+                    :func:`upnpy.soap.DataTypes.compile_result_converter`).
+
+                    :param action: Action of the schema or of one of its services
+                    :type action: SSDPDevice.Service.Action
+                    :return: Function converting the results of the action
+                    :rtype: callable
+                """
+
+                result_converter = self._result_converters.get(action.name)
+
+                if result_converter is None:
+                    result_converter = DataTypes.compile_result_converter(
+                        action.name, action.args_out, self.state_variables
+                    )
+                    self._result_converters[action.name] = result_converter
+
+                return result_converter
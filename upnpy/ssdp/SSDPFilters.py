@@ -1,3 +1,5 @@
+import ipaddress
+
 import upnpy.utils as utils
 
 
@@ -9,14 +11,76 @@ def port_filter(device, port):
     return device.port == port
 
 
+def subnet_filter(device, subnet):
+
+    """
+        **Check whether a device is in a subnet**
+
+        :param device: SSDPResponse or SSDPDevice to check
+        :param subnet: Subnet in CIDR notation (e.g.: ``192.168.1.0/24``)
+        :type subnet: str
+        :return: True if the device's address is part of the subnet
+        :rtype: bool
+    """
+
+    try:
+        return ipaddress.ip_address(device.host.split('%')[0]) in ipaddress.ip_network(subnet, strict=False)
+    except ValueError:
+        return False
+
+
 def header_filter(device, headers):
     device_contains_header = False
 
     for header, value in headers.items():
-        if utils.parse_http_header(device.response, header) == value:
+        header_value = device.headers.get(header)
+
+        # Values used to be compared by their first word only, which is still accepted
+        if header_value is not None and (header_value == value or header_value.split()[:1] == [value]):
             device_contains_header = True
         else:
             device_contains_header = False
             break
 
     return device_contains_header
+
+
+def server_filter(device, product):
+
+    """
+        **Check whether a device's SERVER header contains a product token**
+
+        :param device: SSDPResponse or SSDPDevice to check
+        :param product: Product token to look for (e.g.: ``UPnP/1.1`` or ``MiniUPnPd/2.1``), case-insensitive
+        :type product: str
+        :return: True if the product token is part of the SERVER header
+        :rtype: bool
+    """
+
+    server = device.headers.get('server')
+
+    if server is None:
+        return False
+    return product.lower() in server.lower().split()
+
+
+def device_type_filter(device, device_type):
+
+    """
+        **Check whether a response was sent for a device type**
+
+        Matches the device type in the ST (search response) or NT (announcement) header, so the device has to be
+        searched for by its device type (e.g.: ``urn:schemas-upnp-org:device:InternetGatewayDevice:1``).
+
+        :param device: SSDPResponse or SSDPDevice to check
+        :param device_type: Device type without the URN prefix and version (e.g.: ``InternetGatewayDevice``)
+        :type device_type: str
+        :return: True if the response was sent for the device type
+        :rtype: bool
+    """
+
+    target = device.headers.get('st') or device.headers.get('nt')
+
+    if target is None or ':device:' not in target:
+        return False
+    return utils.parse_device_type(target) == device_type
@@ -0,0 +1,253 @@
+import ipaddress
+import select
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from upnpy.ssdp.SSDPDevice import SSDPDevice
+from upnpy.ssdp.SSDPRequest import DEFAULT_MAX_WORKERS, _MAX_DATAGRAM_SIZE, _split_max_workers
+from upnpy.ssdp.SSDPResponse import SSDPResponse, parse_notify
+from upnpy.upnp.DeviceRegistry import DeviceRegistry, DEFAULT_MAX_AGE
+import upnpy.utils as utils
+
+
+ROOT_DEVICE_NT = 'upnp:rootdevice'
+
+
+class SSDPListener:
+
+    """
+        **Passive SSDP listener**
+
+        Listens for the ``NOTIFY`` announcements devices multicast when they join, stay on and leave the network, and
+        keeps a :class:`upnpy.upnp.DeviceRegistry.DeviceRegistry` up to date from them without sending any requests
+        besides retrieving the description of new devices.
+
+        Devices are introspected once when their root device announces itself with ``ssdp:alive``, and only again if
+        their location or ``BOOTID.UPNP.ORG`` changes. Later announcements extend their lifetime by the
+        ``CACHE-CONTROL`` max-age, ``ssdp:byebye`` removes them right away.
+
+        :param registry: Registry to keep up to date, a new one is created if not set
+        :type registry: upnpy.upnp.DeviceRegistry.DeviceRegistry
+        :param max_workers: Maximum number of concurrent description / SCPD requests (at least two, one of each,
+                            unless ``lazy`` is set)
+        :type max_workers: int
+        :param lazy: Only retrieve a service's description once its actions or state variables are accessed
+        :type lazy: bool
+        :param cache: Optional persistent cache for device and service descriptions
+        :type cache: upnpy.cache.DescriptionCache
+        :param filters: Functions called with the SSDPResponse of every announcement, devices are only introspected
+                        if all of them return True
+        :type filters: list
+        :param interfaces: Addresses of the local interfaces to listen on, or ``'all'`` to listen on every interface.
+                           By default the interface is chosen by the operating system
+        :type interfaces: list or str
+        :param ssdp_mcast_addr: SSDP multicast address
+        :type ssdp_mcast_addr: str
+        :param ssdp_port: SSDP port
+        :type ssdp_port: int
+    """
+
+    def __init__(self, registry=None, max_workers=DEFAULT_MAX_WORKERS, lazy=False, cache=None, filters=None,
+                 interfaces=None, ssdp_mcast_addr='239.255.255.250', ssdp_port=1900):
+        self.registry = registry if registry is not None else DeviceRegistry()
+        self.SSDP_MCAST_ADDR = ssdp_mcast_addr
+        self.SSDP_PORT = ssdp_port
+        self._max_workers = max_workers
+        self._lazy = lazy
+        self._cache = cache
+        self._filters = filters
+        self._interfaces = interfaces
+
+        self._lock = threading.Lock()
+        self._pending_devices = {}
+        self._socket = None
+        self._thread = None
+        self._stop_listening = threading.Event()
+        self._device_executor = None
+        self._service_executor = None
+
+    def start(self):
+
+        """
+            **Start listening for announcements in the background**
+
+            :return: The listener itself
+            :rtype: SSDPListener
+        """
+
+        if self._thread is not None:
+            return self
+
+        self._socket = self._open_socket()
+        self._stop_listening.clear()
+        device_workers, service_workers = _split_max_workers(self._max_workers, self._lazy)
+        self._device_executor = ThreadPoolExecutor(device_workers)
+        self._service_executor = ThreadPoolExecutor(service_workers)
+
+        self._thread = threading.Thread(target=self._listen)
+        self._thread.daemon = True
+        self._thread.start()
+
+        return self
+
+    def stop(self):
+
+        """
+            **Stop listening for announcements**
+
+            Devices already in the registry are kept.
+        """
+
+        if self._thread is None:
+            return
+
+        self._stop_listening.set()
+        self._thread.join()
+        self._thread = None
+
+        with self._lock:
+            pending_devices = list(self._pending_devices.values())
+            self._pending_devices.clear()
+
+        for pending_device, _ in pending_devices:
+            pending_device.cancel()
+
+        self._device_executor.shutdown(wait=False)
+        self._service_executor.shutdown(wait=False)
+        self._socket.close()
+
+    def is_listening(self):
+
+        """
+            **Check whether the listener is running**
+
+            :rtype: bool
+        """
+
+        return self._thread is not None
+
+    def _open_socket(self):
+
+        """
+        Open a socket on the SSDP port and join the multicast group on the requested interfaces. Other SSDP
+        clients on the host are usually bound to the port as well, so it is opened for reuse.
+        """
+
+        listen_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        listen_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, 'SO_REUSEPORT'):
+            listen_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+
+        listen_socket.bind(('', self.SSDP_PORT))
+
+        if ipaddress.ip_address(self.SSDP_MCAST_ADDR).is_multicast:
+            if self._interfaces is None:
+                interfaces = ['0.0.0.0']
+            elif self._interfaces == 'all':
+                interfaces = utils.get_local_ipv4_addresses()
+            else:
+                interfaces = self._interfaces
+
+            for interface in interfaces:
+                listen_socket.setsockopt(
+                    socket.IPPROTO_IP,
+                    socket.IP_ADD_MEMBERSHIP,
+                    socket.inet_aton(self.SSDP_MCAST_ADDR) + socket.inet_aton(interface)
+                )
+
+        return listen_socket
+
+    def _listen(self):
+        while not self._stop_listening.is_set():
+            readable, _, _ = select.select([self._socket], [], [], 0.1)
+            if not readable:
+                continue
+
+            try:
+                notify, addr = self._socket.recvfrom(_MAX_DATAGRAM_SIZE)
+            except OSError:
+                continue
+
+            self._handle_notify(addr, notify)
+
+    def _handle_notify(self, addr, notify):
+
+        """
+        Update the registry from a single announcement. Search requests and responses sent by other hosts to the
+        SSDP port are ignored.
+        """
+
+        headers = parse_notify(notify)
+        if headers is None:
+            return
+
+        nts = headers['nts']
+        usn = headers['usn']
+
+        # All announcements of a device refer to the registry entry of its root device
+        root_usn = f'{usn.split("::", 1)[0]}::{ROOT_DEVICE_NT}'
+
+        if nts == 'ssdp:byebye':
+            with self._lock:
+                pending_device = self._pending_devices.pop(root_usn, None)
+
+            if pending_device is not None:
+                pending_device[0].cancel()
+
+            self.registry.remove(root_usn)
+            return
+
+        if nts not in ('ssdp:alive', 'ssdp:update'):
+            return
+
+        max_age = utils.parse_max_age(headers.get('cache-control')) or DEFAULT_MAX_AGE
+        device = self.registry.get(root_usn)
+
+        if device is not None and device.headers.get('location') == headers.get('location') and \
+                device.boot_id == headers.get('bootid.upnp.org'):
+            self.registry.refresh(root_usn, max_age)
+            return
+
+        # Only the root device announcement names the location of the root device description
+        if headers.get('nt') != ROOT_DEVICE_NT or not headers.get('location'):
+            return
+
+        if self._filters:
+            ssdp_response = SSDPResponse(addr, notify, headers=headers)
+            if not all(ssdp_filter(ssdp_response) for ssdp_filter in self._filters):
+                return
+
+        with self._lock:
+            if root_usn in self._pending_devices:
+                return
+
+            pending_device = self._device_executor.submit(
+                SSDPDevice, addr, notify, self._service_executor, self._lazy, self._cache, headers=headers
+            )
+            self._pending_devices[root_usn] = (pending_device, max_age)
+
+        pending_device.add_done_callback(lambda future: self._register_device(root_usn, future))
+
+    def _register_device(self, usn, pending_device):
+
+        """
+        Add an introspected device to the registry unless it said goodbye in the meantime.
+        """
+
+        with self._lock:
+            entry = self._pending_devices.get(usn)
+            if entry is None or entry[0] is not pending_device:
+                return
+            del self._pending_devices[usn]
+
+        if pending_device.cancelled() or pending_device.exception() is not None:
+            return
+
+        self.registry.add(pending_device.result(), entry[1])
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -1,6 +1,41 @@
+import queue
+import select
 import socket
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from upnpy.ssdp.SSDPHeader import SSDPHeader
 from upnpy.ssdp.SSDPDevice import SSDPDevice
+from upnpy.ssdp.SSDPResponse import DuplicateResponseFilter, SSDPResponse, parse_search_response
+import upnpy.utils as utils
+
+
+DEFAULT_MAX_WORKERS = 16
+
+# Link-local and site-local scoped SSDP multicast addresses
+SSDP_IPV6_MCAST_ADDRS = ('ff02::c', 'ff05::c')
+
+# Largest possible UDP payload, IPv4 limits it to 65507 bytes and IPv6 (without jumbograms) to 65527 bytes
+# https://en.wikipedia.org/wiki/User_Datagram_Protocol#Packet_structure
+_MAX_DATAGRAM_SIZE = 65527
+
+# Hop limit for IPv6 requests so site-local searches can pass a router, as recommended by UDA 2.0
+_IPV6_MULTICAST_HOPS = 2
+
+
+def _split_max_workers(max_workers, lazy=False):
+
+    """
+    Split the maximum number of concurrent description requests between the pool fetching device descriptions and
+    the pool fetching SCPDs, so that both together stay within it. Each pool needs at least one worker, so at least
+    two requests can be in flight. Lazy devices don't fetch their SCPDs in the pool, it gets a single idle worker.
+    """
+
+    if lazy:
+        return max_workers, 1
+
+    device_workers = max(1, max_workers // 2)
+    return device_workers, max(1, max_workers - device_workers)
 
 
 class SSDPRequest(SSDPHeader):
@@ -11,17 +46,20 @@ class SSDPRequest(SSDPHeader):
         :param method: SSDP request method [M-SEARCH or NOTIFY]
     """
 
-    def __init__(self, ssdp_mcast_addr='239.255.255.250', ssdp_port=1900, **headers):
+    def __init__(self, ssdp_mcast_addr='239.255.255.250', ssdp_port=1900, ssdp_ipv6_mcast_addrs=SSDP_IPV6_MCAST_ADDRS,
+                 **headers):
         super().__init__(**headers)
 
         self.SSDP_MCAST_ADDR = ssdp_mcast_addr
+        self.SSDP_IPV6_MCAST_ADDRS = ssdp_ipv6_mcast_addrs
         self.SSDP_PORT = ssdp_port
 
         self.set_header('HOST', f'{self.SSDP_MCAST_ADDR}:{self.SSDP_PORT}')
 
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
 
-    def m_search(self, discover_delay=2, st='ssdp:all', **headers):
+    def m_search(self, discover_delay=2, st='ssdp:all', max_workers=DEFAULT_MAX_WORKERS, lazy=False, cache=None,
+                 filters=None, interfaces=None, ipv6=False, registry=None, **headers):
 
         """
             **Perform an M-SEARCH SSDP request**
@@ -30,28 +68,79 @@ class SSDPRequest(SSDPHeader):
 
             :param discover_delay: Device discovery delay in seconds
             :type discover_delay: int
-            :param st: Specify device Search Target
-            :type st: str
+            :param st: Specify device Search Target, or a list of targets to send one M-SEARCH request for each
+            :type st: str or list
+            :param max_workers: Maximum number of concurrent description / SCPD requests (at least two, one of each,
+                                unless ``lazy`` is set)
+            :type max_workers: int
+            :param lazy: Defer retrieving service descriptions until a service's actions are accessed
+            :type lazy: bool
+            :param cache: Optional persistent cache for device and service descriptions
+            :type cache: upnpy.cache.DescriptionCache
+            :param filters: Functions called with the SSDPResponse of every reply, devices are only introspected if
+                            all of them return True
+            :type filters: list
+            :param interfaces: Addresses of the local interfaces to search on, or ``'all'`` to search on every
+                               interface. By default only the interface of the default route is used
+            :type interfaces: list or str
+            :param ipv6: Search on the IPv6 link-local and site-local SSDP addresses as well. IPv6 requests go out
+                         on every interface if ``interfaces`` is ``'all'``, otherwise on the default interface
+            :type ipv6: bool
+            :param registry: Registry of known devices, responding devices that are registered with an unchanged
+                             configuration are handed out again without being introspected
+            :type registry: upnpy.upnp.DeviceRegistry.DeviceRegistry
             :param headers: Specify M-SEARCH specific headers
             :type headers: str
-            :return: List of device that replied
-            :rtype: list
+            :return: Generator yielding every device that replied as soon as its description has been retrieved
+            :rtype: generator
         """
 
+        requests = self._get_m_search_requests(discover_delay, st, interfaces, ipv6, **headers)
+        self.socket.settimeout(discover_delay)
+
+        yield from self._send_request(requests, discover_delay, max_workers, lazy, cache, filters, registry)
+
+    def _get_m_search_requests(self, discover_delay, st, interfaces=None, ipv6=False, own_socket=False, **headers):
+
+        """
+        Open the sockets for an M-SEARCH request and build the messages to send on each of them. Returns a list of
+        sockets along with the local interface they send through and their messages with their destinations.
+        """
+
+        search_targets = [st] if isinstance(st, str) else st
+        requests = []
+
+        for request_socket, interface, destinations in self._open_sockets(interfaces, ipv6, own_socket):
+            messages = []
+
+            # The HOST header has to name the multicast address each request is sent to
+            for destination, multicast_host in destinations:
+                for search_target in search_targets:
+                    self._set_m_search_headers(discover_delay, search_target, multicast_host, **headers)
+                    messages.append((self._get_raw_request(), destination))
+
+            requests.append((request_socket, interface, messages))
+
+        self._set_m_search_headers(discover_delay, search_targets[0], **headers)
+        return requests
+
+    def _set_m_search_headers(self, discover_delay, st, multicast_host=None, **headers):
+
+        """
+        Set the method and headers for an M-SEARCH request. The HOST header defaults to the IPv4 multicast address.
+        """
+
+        if multicast_host is None:
+            multicast_host = f'{self.SSDP_MCAST_ADDR}:{self.SSDP_PORT}'
+
         self.set_method('M-SEARCH')
 
+        self.set_header('HOST', multicast_host)
         self.set_header('MAN', '"ssdp:discover"')
         self.set_header('MX', discover_delay)
         self.set_header('ST', st)
         self.set_headers(**headers)
 
-        self.socket.settimeout(discover_delay)
-
-        devices = self._send_request(self._get_raw_request())
-
-        for device in devices:
-            yield device
-
     def notify(self, **headers):
 
         """
@@ -85,21 +174,184 @@ class SSDPRequest(SSDPHeader):
 
         return final_request_data
 
-    def _send_request(self, message):
-        self.socket.sendto(message.encode(), (self.SSDP_MCAST_ADDR, self.SSDP_PORT))
+    def _open_sockets(self, interfaces, ipv6=False, own_socket=False):
 
-        devices = []
+        """
+        Open the sockets to search with, each along with the local interface it sends through and the multicast
+        destinations (socket address and HOST header) to send to. Without interfaces the request's own socket is
+        used for IPv4, which sends through the interface of the default route, or a new socket if own_socket is set.
+        """
+
+        ipv4_destinations = [((self.SSDP_MCAST_ADDR, self.SSDP_PORT), f'{self.SSDP_MCAST_ADDR}:{self.SSDP_PORT}')]
+        sockets = []
+
+        if interfaces is None:
+            if own_socket:
+                default_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                default_socket.bind(('0.0.0.0', 0))
+            else:
+                default_socket = self.socket
+            sockets.append((default_socket, None, ipv4_destinations))
+        else:
+            ipv4_interfaces = utils.get_local_ipv4_addresses() if interfaces == 'all' else interfaces
+
+            for interface in ipv4_interfaces:
+                interface_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                interface_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(interface))
+                interface_socket.bind((interface, 0))
+                sockets.append((interface_socket, interface, ipv4_destinations))
+
+        if ipv6:
+            if interfaces == 'all':
+                ipv6_interfaces = [(index, name) for index, name in socket.if_nameindex() if name != 'lo']
+            else:
+                ipv6_interfaces = [(0, None)]
+
+            for interface_index, interface_name in ipv6_interfaces:
+                interface_socket = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM)
+                interface_socket.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_MULTICAST_IF, interface_index)
+                interface_socket.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_MULTICAST_HOPS, _IPV6_MULTICAST_HOPS)
+                interface_socket.bind(('::', 0))
+
+                ipv6_destinations = [
+                    ((multicast_address, self.SSDP_PORT, 0, interface_index), f'[{multicast_address}]:{self.SSDP_PORT}')
+                    for multicast_address in self.SSDP_IPV6_MCAST_ADDRS
+                ]
+                sockets.append((interface_socket, interface_name, ipv6_destinations))
+
+        return sockets
+
+    def _receive_responses(self, sockets, discover_delay, create_device, completed_devices, stop_receiving, filters):
+
+        """
+        Receive M-SEARCH responses on all sockets until no device replied within the discovery delay or until
+        stop_receiving is set. Every distinct device passing the filters is handed to create_device and the resulting
+        futures are put on the completed_devices queue once done, followed by the total number of devices.
+        """
+
+        response_count = 0
+        last_response_time = time.monotonic()
+        socket_interfaces = {request_socket: interface for request_socket, interface, _ in sockets}
+
+        duplicate_filter = DuplicateResponseFilter()
 
         try:
-            while True:
+            while not stop_receiving.is_set():
+                remaining_delay = discover_delay - (time.monotonic() - last_response_time)
+                if remaining_delay <= 0:
+                    break
+
+                # Wake up regularly to notice when the discovery has been stopped early
+                readable, _, _ = select.select(list(socket_interfaces), [], [], min(remaining_delay, 0.1))
 
-                # UDP packet data limit is 65507 imposed by IPv4
-                # https://en.wikipedia.org/wiki/User_Datagram_Protocol#Packet_structure
+                for readable_socket in readable:
+                    response, addr = readable_socket.recvfrom(_MAX_DATAGRAM_SIZE)
+                    last_response_time = time.monotonic()
 
-                response, addr = self.socket.recvfrom(65507)
-                device = SSDPDevice(addr, response.decode())
-                devices.append(device)
+                    # The headers are parsed once, datagrams that aren't valid responses are dropped right away
+                    headers = parse_search_response(response)
+                    if headers is None:
+                        continue
+
+                    interface = socket_interfaces[readable_socket]
+
+                    # Filter on the raw response before spending any requests on the device
+                    if filters:
+                        ssdp_response = SSDPResponse(addr, response, interface, headers)
+                        if not all(ssdp_filter(ssdp_response) for ssdp_filter in filters):
+                            continue
+
+                    if duplicate_filter.is_duplicate(headers):
+                        continue
+
+                    create_device(addr, response, interface, headers).add_done_callback(completed_devices.put)
+                    response_count += 1
         except socket.timeout:
             pass
+        finally:
+            completed_devices.put(response_count)
+
+    @staticmethod
+    def _send_messages(requests):
+
+        """
+        Send the messages of M-SEARCH requests on their sockets.
+        """
+
+        # Requests go out on every socket at once so all replies, IPv4 and IPv6 and on every interface,
+        # arrive within a single discovery window
+        for request_socket, _, messages in requests:
+            for message, destination in messages:
+                try:
+                    request_socket.sendto(message.encode(), destination)
+                except OSError:
+                    # IPv6 scopes or interfaces may not have a route to the multicast address
+                    if request_socket.family != socket.AF_INET6:
+                        raise
+
+    def _send_request(self, requests, discover_delay, max_workers=DEFAULT_MAX_WORKERS, lazy=False, cache=None,
+                      filters=None, registry=None):
+
+        self._send_messages(requests)
+
+        # Device descriptions and SCPDs are fetched by separate pools so that a device waiting on its
+        # services can never starve the service requests of a worker. They share max_workers between them.
+        device_workers, service_workers = _split_max_workers(max_workers, lazy)
+        device_executor = ThreadPoolExecutor(device_workers)
+        service_executor = ThreadPoolExecutor(service_workers)
+
+        completed_devices = queue.Queue()
+        stop_receiving = threading.Event()
+        pending_devices = []
+
+        def create_device(addr, response, interface, headers):
+            if registry is not None:
+                known_device = registry.lookup(headers)
+
+                if known_device is not None:
+                    completed_device = Future()
+                    completed_device.set_result(known_device)
+                    return completed_device
+
+            pending_device = device_executor.submit(
+                SSDPDevice, addr, response, service_executor, lazy, cache, interface=interface, headers=headers
+            )
+            pending_devices.append(pending_device)
+            return pending_device
+
+        # Responses are received on a separate thread so that devices can be handed out while others reply
+        receiver = threading.Thread(
+            target=self._receive_responses,
+            args=(requests, discover_delay, create_device, completed_devices, stop_receiving, filters)
+        )
+        receiver.daemon = True
+        receiver.start()
+
+        try:
+            response_count = None
+            yielded_count = 0
+
+            while response_count is None or yielded_count < response_count:
+                completed_device = completed_devices.get()
+
+                if isinstance(completed_device, int):
+                    response_count = completed_device
+                    continue
+
+                yielded_count += 1
+                yield completed_device.result()
+        finally:
+            # Stop right away if the caller stopped iterating early, requests already in progress finish in the
+            # background and their results are discarded
+            stop_receiving.set()
+            receiver.join()
+
+            for pending_device in pending_devices:
+                pending_device.cancel()
+
+            device_executor.shutdown(wait=False)
+            service_executor.shutdown(wait=False)
 
-        return devices
+            for request_socket, _, _ in requests:
+                if request_socket is not self.socket:
+                    request_socket.close()
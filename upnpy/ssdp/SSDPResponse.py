@@ -0,0 +1,197 @@
+_SEARCH_RESPONSE_PREFIXES = (b'HTTP/1.1 200 ', b'HTTP/1.0 200 ', b'HTTP/1.1 200\r', b'HTTP/1.0 200\r')
+_NOTIFY_PREFIX = b'NOTIFY * HTTP/1.'
+
+
+class SSDPHeaders(dict):
+
+    """
+        **Case-insensitive SSDP headers**
+
+        Dictionary of the headers of an SSDP message by their lower-case names, which can be looked up by any case
+        (e.g.: ``headers['Location']`` or ``headers.get('CACHE-CONTROL')``). The first line of the message is kept in
+        ``start_line``.
+    """
+
+    __slots__ = ('start_line',)
+
+    def __init__(self, start_line=''):
+        super().__init__()
+        self.start_line = start_line
+
+    def __getitem__(self, name):
+        return super().__getitem__(name.lower())
+
+    def __contains__(self, name):
+        return super().__contains__(name.lower())
+
+    def get(self, name, default=None):
+        return super().get(name.lower(), default)
+
+
+def parse_headers(message):
+
+    """
+        **Parse the headers of an SSDP message**
+
+        The message is split into lines and headers only once, directly from the received bytes. When a header
+        occurs more than once the first value is used.
+
+        :param message: Raw SSDP message
+        :type message: bytes or str
+        :return: The headers, or None if the message is malformed
+        :rtype: SSDPHeaders
+    """
+
+    if isinstance(message, str):
+        message = message.encode('utf-8', 'replace')
+
+    lines = message.splitlines()
+    if not lines:
+        return None
+
+    headers = SSDPHeaders(lines[0].decode('latin-1').strip())
+
+    for line in lines[1:]:
+        # An empty line ends the headers
+        if not line:
+            break
+
+        name, separator, value = line.partition(b':')
+        if not separator:
+            return None
+
+        headers.setdefault(name.strip().decode('latin-1').lower(), value.strip().decode('utf-8', 'replace'))
+
+    return headers
+
+
+def parse_search_response(datagram):
+
+    """
+        **Parse an M-SEARCH response**
+
+        Datagrams that aren't successful responses are rejected by their first bytes, before anything is parsed.
+        Responses without a LOCATION header are rejected as well since their device can't be introspected.
+
+        :param datagram: Datagram received in reply to an M-SEARCH request
+        :type datagram: bytes
+        :return: The headers, or None if the datagram isn't a valid response
+        :rtype: SSDPHeaders
+    """
+
+    if not datagram.startswith(_SEARCH_RESPONSE_PREFIXES):
+        return None
+
+    headers = parse_headers(datagram)
+
+    if headers is None or not headers.get('location'):
+        return None
+    return headers
+
+
+def parse_notify(datagram):
+
+    """
+        **Parse a NOTIFY announcement**
+
+        :param datagram: Datagram received on the SSDP port
+        :type datagram: bytes
+        :return: The headers, or None if the datagram isn't a valid announcement
+        :rtype: SSDPHeaders
+    """
+
+    if not datagram.startswith(_NOTIFY_PREFIX):
+        return None
+
+    headers = parse_headers(datagram)
+
+    if headers is None or not headers.get('usn') or not headers.get('nts'):
+        return None
+    return headers
+
+
+class DuplicateResponseFilter:
+
+    """
+        **Drop duplicate search responses**
+
+        Devices send duplicate responses as well as one response per embedded device and service. Only the first
+        response for every USN and location should be introspected, so every physical device is introspected once
+        per discovery.
+    """
+
+    __slots__ = ('_usns', '_locations')
+
+    def __init__(self):
+        self._usns = set()
+        self._locations = set()
+
+    def is_duplicate(self, headers):
+
+        """
+            **Check whether a response has been received before**
+
+            :param headers: Headers of the response
+            :type headers: SSDPHeaders
+            :return: True if a response with the same USN or location has been received before
+            :rtype: bool
+        """
+
+        usn = headers.get('usn')
+        location = headers.get('location')
+
+        if usn is not None:
+            if usn in self._usns:
+                return True
+            self._usns.add(usn)
+
+        if location is not None:
+            if location in self._locations:
+                return True
+            self._locations.add(location)
+
+        return False
+
+
+class SSDPResponse:
+
+    """
+        **Represents a raw SSDP response**
+
+        Holds a response as it was received, before the device that sent it has been introspected. It offers the
+        same ``address``, ``host``, ``port``, ``response``, ``headers`` and ``interface`` attributes as
+        :class:`SSDPDevice`, so the functions in :mod:`upnpy.ssdp.SSDPFilters` accept both.
+
+        :param address: SSDP device address
+        :type address: tuple
+        :param response: Device discovery response data
+        :type response: bytes or str
+        :param interface: Address of the local interface the response was received on
+        :type interface: str
+        :param headers: Headers of the response if they have been parsed already
+        :type headers: SSDPHeaders
+    """
+
+    def __init__(self, address, response, interface=None, headers=None):
+        self.address = address
+        self.host = address[0]
+        self.port = address[1]
+        self.interface = interface
+        self.headers = headers if headers is not None else parse_headers(response) or SSDPHeaders()
+        self._response = response
+
+    @property
+    def response(self):
+
+        """
+            **Response text**
+
+            Only decoded when accessed, filters should use ``headers`` instead.
+        """
+
+        if isinstance(self._response, bytes):
+            self._response = self._response.decode('utf-8', 'replace')
+        return self._response
+
+    def __repr__(self):
+        return f'SSDPResponse <{self.host}:{self.port}>'
@@ -0,0 +1,331 @@
+import asyncio
+import functools
+import urllib.error
+
+from upnpy.ssdp.SSDPDevice import SSDPDevice
+from upnpy.ssdp.SSDPRequest import DEFAULT_MAX_WORKERS
+from upnpy.ssdp.SSDPResponse import DuplicateResponseFilter, SSDPResponse, parse_search_response
+from upnpy.upnp.UPnP import IGD_SEARCH_TARGETS, UPnP, _is_igd
+from upnpy import async_http
+from upnpy import exceptions
+import upnpy.utils as utils
+
+
+# Options of UPnP.discover that would block the event loop
+_UNSUPPORTED_OPTIONS = ('cache', 'max_workers')
+
+
+class _SSDPProtocol(asyncio.DatagramProtocol):
+
+    """
+    Datagram protocol handing every M-SEARCH response to a callback.
+    """
+
+    def __init__(self, on_response):
+        self._on_response = on_response
+
+    def datagram_received(self, data, addr):
+        self._on_response(addr, data)
+
+    def error_received(self, exc):
+        pass
+
+
+class AsyncUPnP(UPnP):
+
+    """
+        **Asynchronous UPnP object**
+
+        A UPnP object used for device discovery from asyncio code. Descriptions and SCPDs are retrieved on the
+        event loop instead of in threads, and actions can be executed with
+        :meth:`SSDPDevice.Service.Action.call_async`.
+    """
+
+    async def discover(self, delay=2, max_concurrency=DEFAULT_MAX_WORKERS, lazy=False, callback=None,
+                       max_devices=None, stop_when=None, st='upnp:rootdevice', filters=None, interfaces=None,
+                       ipv6=False, refresh=False, **headers):
+
+        """
+            **Find UPnP devices on the network**
+
+            Find available UPnP devices on the network by sending an M-SEARCH request.
+
+            Takes the same options as :meth:`UPnP.discover`, except for the persistent description cache, whose
+            requests would block the event loop.
+
+            :param delay: Discovery delay, amount of time in seconds to wait for a reply from devices
+            :type delay: int
+            :param max_concurrency: Maximum number of device / service descriptions to retrieve concurrently
+            :type max_concurrency: int
+            :param lazy: Only retrieve a service's description once its actions or state variables are accessed, it
+                         is then retrieved synchronously
+            :type lazy: bool
+            :param callback: Optional function called with every device as soon as it has been discovered
+            :type callback: callable
+            :param max_devices: Stop the discovery once this many devices have been found
+            :type max_devices: int
+            :param stop_when: Stop the discovery as soon as a device for which this function returns True is found
+            :type stop_when: callable
+            :param st: Search target, or a list of search targets
+            :type st: str or list
+            :param filters: Functions evaluated on the raw SSDP response of every device before it is introspected
+            :type filters: list
+            :param interfaces: Addresses of the local interfaces to search on, or ``'all'`` to search on every
+                               interface at once
+            :type interfaces: list or str
+            :param ipv6: Search on the IPv6 SSDP addresses in parallel with IPv4
+            :type ipv6: bool
+            :param refresh: Introspect every responding device again, even if it is registered with the same
+                            configuration
+            :type refresh: bool
+            :param headers: Optional headers for the request
+            :return: List of discovered devices
+            :rtype: list
+        """
+
+        devices = self.discover_iter(
+            delay=delay,
+            max_concurrency=max_concurrency,
+            lazy=lazy,
+            max_devices=max_devices,
+            stop_when=stop_when,
+            st=st,
+            filters=filters,
+            interfaces=interfaces,
+            ipv6=ipv6,
+            refresh=refresh,
+            **headers
+        )
+
+        try:
+            async for device in devices:
+                if callback is not None:
+                    callback(device)
+        finally:
+            await devices.aclose()
+
+        return self.discovered_devices
+
+    async def discover_iter(self, delay=2, max_concurrency=DEFAULT_MAX_WORKERS, lazy=False, max_devices=None,
+                            stop_when=None, st='upnp:rootdevice', filters=None, interfaces=None, ipv6=False,
+                            refresh=False, **headers):
+
+        """
+            **Find UPnP devices on the network as they respond**
+
+            Same as :meth:`discover`, but an asynchronous generator yielding every device as soon as its response
+            has arrived and its description has been retrieved. The discovery stops once the generator is closed,
+            which ``async for`` doesn't do by itself when it is left early.
+
+            :param delay: Discovery delay, amount of time in seconds to wait for a reply from devices
+            :type delay: int
+            :param max_concurrency: Maximum number of device / service descriptions to retrieve concurrently
+            :type max_concurrency: int
+            :param lazy: Only retrieve a service's description once its actions or state variables are accessed
+            :type lazy: bool
+            :param max_devices: Stop the discovery once this many devices have been found
+            :type max_devices: int
+            :param stop_when: Stop the discovery as soon as a device for which this function returns True is found
+            :type stop_when: callable
+            :param st: Search target, or a list of search targets
+            :type st: str or list
+            :param filters: Functions evaluated on the raw SSDP response of every device before it is introspected
+            :type filters: list
+            :param interfaces: Addresses of the local interfaces to search on, or ``'all'`` to search on every
+                               interface at once
+            :type interfaces: list or str
+            :param ipv6: Search on the IPv6 SSDP addresses in parallel with IPv4
+            :type ipv6: bool
+            :param refresh: Introspect every responding device again, even if it is registered with the same
+                            configuration
+            :type refresh: bool
+            :param headers: Optional headers for the request
+            :return: Asynchronous generator yielding the discovered devices
+        """
+
+        # Options of the synchronous discovery would otherwise be sent as M-SEARCH headers
+        for option in _UNSUPPORTED_OPTIONS:
+            if option in headers:
+                raise TypeError(f'AsyncUPnP.discover doesn\'t support the "{option}" option.')
+
+        loop = asyncio.get_event_loop()
+        semaphore = asyncio.Semaphore(max_concurrency)
+        registry = None if refresh else self.registry
+        duplicate_filter = DuplicateResponseFilter()
+        completed_devices = asyncio.Queue()
+        pending_devices = set()
+        last_response_time = loop.time()
+
+        def on_response(interface, addr, response):
+            nonlocal last_response_time
+            last_response_time = loop.time()
+
+            headers = parse_search_response(response)
+            if headers is None:
+                return
+
+            # Filter on the raw response before spending any requests on the device
+            if filters:
+                ssdp_response = SSDPResponse(addr, response, interface, headers)
+                if not all(ssdp_filter(ssdp_response) for ssdp_filter in filters):
+                    return
+
+            if duplicate_filter.is_duplicate(headers):
+                return
+
+            if registry is not None:
+                known_device = registry.lookup(headers)
+
+                if known_device is not None:
+                    completed_devices.put_nowait(known_device)
+                    return
+
+            pending_device = loop.create_task(
+                self._introspect_device(addr, response, headers, semaphore, interface, lazy)
+            )
+            pending_device.add_done_callback(completed_devices.put_nowait)
+            pending_devices.add(pending_device)
+
+        self.discovered_devices = []
+
+        requests = self.ssdp._get_m_search_requests(delay, st, interfaces, ipv6, own_socket=True, **headers)
+        transports = []
+        receiving = True
+
+        try:
+            for request_socket, interface, _ in requests:
+                transport, _ = await loop.create_datagram_endpoint(
+                    functools.partial(_SSDPProtocol, functools.partial(on_response, interface)),
+                    sock=request_socket
+                )
+                transports.append(transport)
+
+            self.ssdp._send_messages(requests)
+
+            while True:
+                if receiving:
+                    # Wait until no device replied within the discovery delay, like the synchronous discovery
+                    timeout = last_response_time + delay - loop.time()
+                    if timeout <= 0:
+                        receiving = False
+                        for transport in transports:
+                            transport.close()
+                        continue
+                elif not pending_devices and completed_devices.empty():
+                    break
+                else:
+                    timeout = None
+
+                try:
+                    completed_device = await asyncio.wait_for(completed_devices.get(), timeout)
+                except asyncio.TimeoutError:
+                    continue
+
+                if isinstance(completed_device, asyncio.Future):
+                    pending_devices.discard(completed_device)
+                    completed_device = completed_device.result()
+
+                self.discovered_devices.append(completed_device)
+                self.registry.add(completed_device)
+                yield completed_device
+
+                if max_devices is not None and len(self.discovered_devices) >= max_devices:
+                    break
+                if stop_when is not None and stop_when(completed_device):
+                    break
+        finally:
+            # Stop right away if the discovery ended early, descriptions still being retrieved are discarded
+            for transport in transports:
+                transport.close()
+
+            # Sockets are closed along with their transports, those that didn't get one yet are closed directly
+            for request_socket, _, _ in requests[len(transports):]:
+                request_socket.close()
+
+            for pending_device in pending_devices:
+                pending_device.cancel()
+
+    def get_igd(self, discover=False, delay=2, **discover_options):
+
+        """
+            **Get the Internet Gateway Device if available**
+
+            Selects the IGD from the previously discovered devices, see :meth:`UPnP.get_igd`. Searching for the IGD
+            would block the event loop, use :meth:`discover_igd` for that instead.
+
+            :param discover: Not supported, use :meth:`discover_igd`
+            :type discover: bool
+            :return: The IGD if successful or raises a upnpy.exceptions.IGDError exception upon failure
+            :rtype: SSDPDevice
+        """
+
+        if discover:
+            raise TypeError('AsyncUPnP.get_igd can\'t search for the IGD, use "await AsyncUPnP.discover_igd()".')
+
+        return super().get_igd()
+
+    async def discover_igd(self, delay=2, **discover_options):
+
+        """
+            **Search for the Internet Gateway Device**
+
+            Sends a targeted M-SEARCH for Internet Gateway Devices and returns the first IGD as soon as its
+            description has been retrieved, without waiting for the discovery delay.
+
+            :param delay: Discovery delay, amount of time in seconds to wait for the IGD to reply
+            :type delay: int
+            :param discover_options: Optional arguments for :meth:`discover_iter`
+            :return: The IGD if successful or raises a upnpy.exceptions.IGDError exception upon failure
+            :rtype: SSDPDevice
+        """
+
+        devices = self.discover_iter(delay=delay, st=IGD_SEARCH_TARGETS, **discover_options)
+
+        try:
+            async for device in devices:
+                if _is_igd(device):
+                    return device
+        finally:
+            await devices.aclose()
+
+        raise exceptions.IGDError('No IGD found.')
+
+    @staticmethod
+    async def _fetch_description(url, semaphore):
+        async with semaphore:
+            response = await async_http.make_http_request(url)
+        return response.read()
+
+    async def _introspect_device(self, addr, response, headers, semaphore, interface=None, lazy=False):
+
+        """
+        Retrieve the description of a device and, unless lazy is set, the descriptions of all of its services.
+        """
+
+        try:
+            description = await self._fetch_description(headers['location'], semaphore)
+        except (urllib.error.HTTPError, urllib.error.URLError):
+            description = exceptions.NotAvailableError
+
+        device = SSDPDevice(addr, response, lazy=True, description=description, interface=interface, headers=headers)
+        if lazy:
+            return device
+
+        services = device.get_services()
+
+        service_descriptions = await asyncio.gather(
+            *(self._fetch_description(service.scpd_url, semaphore) for service in services),
+            return_exceptions=True
+        )
+
+        for service, service_description in zip(services, service_descriptions):
+            if isinstance(service_description, urllib.error.HTTPError) and service_description.code == 404:
+                service_description = exceptions.NotAvailableError
+            elif isinstance(service_description, Exception):
+                raise service_description
+            else:
+                service_description = service_description.decode()
+
+            service._retrieve_description(service_description)
+
+        return device
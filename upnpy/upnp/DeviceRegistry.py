@@ -0,0 +1,426 @@
+import collections
+import threading
+import time
+
+import upnpy.utils as utils
+
+
+# Announcement lifetime assumed for devices that don't send a CACHE-CONTROL header, the minimum UDA recommends
+DEFAULT_MAX_AGE = 1800
+
+RegistryChanges = collections.namedtuple('RegistryChanges', ['added', 'removed', 'changed'])
+
+_INDEXES = ('device_type', 'service_type', 'host', 'udn', 'friendly_name')
+
+
+def get_max_age(device):
+
+    """
+        **Get the lifetime a device announced**
+
+        :param device: The device
+        :type device: SSDPDevice
+        :return: The CACHE-CONTROL max-age of the device's response, or the default if it didn't send one
+        :rtype: int
+    """
+
+    max_age = utils.parse_max_age(device.headers.get('cache-control'))
+    if max_age is None:
+        return DEFAULT_MAX_AGE
+    return max_age
+
+
+def get_registry_key(device):
+
+    """
+        **Get the key a device is registered under**
+
+        :param device: The device
+        :type device: SSDPDevice
+        :return: The USN of the device, or its location if its response didn't include a USN
+        :rtype: str
+    """
+
+    if device.usn is not None:
+        return device.usn
+    return device.headers.get('location')
+
+
+def _get_type_keys(urn):
+
+    """
+    Get the keys a device or service type is indexed by: the full URN, the type name and the type name with the
+    version (e.g.: ``WANIPConnection`` and ``WANIPConnection:1``).
+    """
+
+    if urn is None:
+        return []
+
+    parts = urn.split(':')
+    if len(parts) < 5:
+        return [urn]
+
+    return [urn, parts[3], f'{parts[3]}:{parts[4]}']
+
+
+def _get_index_keys(usn, device):
+    index_keys = [('host', device.host)]
+
+    # Devices registered by their location don't have a known UDN
+    if device.usn is not None:
+        index_keys.append(('udn', usn.split('::', 1)[0]))
+
+    if device.friendly_name is not None:
+        index_keys.append(('friendly_name', device.friendly_name))
+
+    for key in _get_type_keys(device.type_):
+        index_keys.append(('device_type', key))
+
+    for service in device.services.values():
+        for key in _get_type_keys(service.service):
+            index_keys.append(('service_type', key))
+
+    return index_keys
+
+
+def _get_configuration(headers):
+    return headers.get('location'), headers.get('bootid.upnp.org'), headers.get('configid.upnp.org')
+
+
+class DeviceRegistry:
+
+    """
+        **Registry of the devices currently available on the network**
+
+        Keeps discovered devices by their USN along with the time their announcement expires, so looking up a
+        device is a dictionary access without any network traffic. Devices whose announcement expired are left out
+        of every lookup and dropped. Once the registry holds ``max_size`` devices, the least recently used one is
+        evicted for every new device.
+
+        Every device that has been added, removed (explicitly, by expiry or by eviction) or replaced by a different
+        configuration of itself is recorded, :meth:`get_changes` returns what changed since it was last called.
+
+        Devices are indexed by device type, service type, host, UDN and friendly name, so :meth:`find` and
+        :meth:`find_services` don't have to look at every registered device.
+
+        :param max_size: Maximum number of devices to keep, unlimited if not set
+        :type max_size: int
+    """
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._devices = collections.OrderedDict()
+        self._changes = collections.OrderedDict()
+        self._indexes = {index: collections.defaultdict(dict) for index in _INDEXES}
+
+    def add(self, device, max_age=None):
+
+        """
+            **Add a device to the registry**
+
+            Replaces a device previously registered with the same USN. Devices whose response didn't include a USN
+            are registered by their location instead (see :func:`get_registry_key`). The replacement is recorded as
+            a change if the device's location, ``BOOTID.UPNP.ORG`` or ``CONFIGID.UPNP.ORG`` differs.
+
+            :param device: The device to add
+            :type device: SSDPDevice
+            :param max_age: Amount of time in seconds the device is considered available for, defaults to the
+                            CACHE-CONTROL max-age of the device's response
+            :type max_age: int
+        """
+
+        if max_age is None:
+            max_age = get_max_age(device)
+
+        usn = get_registry_key(device)
+        if usn is None:
+            return
+
+        with self._lock:
+            entry = self._get_entry(usn)
+
+            if entry is not None:
+                self._unindex(usn, entry[0])
+
+            self._devices[usn] = (device, time.monotonic() + max_age)
+            self._devices.move_to_end(usn)
+            self._index(usn, device)
+
+            if entry is None:
+                self._record_change(usn, 'added', device)
+            elif entry[0] is not device and _get_configuration(entry[0].headers) != _get_configuration(device.headers):
+                self._record_change(usn, 'changed', device)
+
+            while self.max_size is not None and len(self._devices) > self.max_size:
+                self._delete(next(iter(self._devices)))
+
+    def refresh(self, usn, max_age=DEFAULT_MAX_AGE):
+
+        """
+            **Extend the lifetime of a registered device**
+
+            :param usn: USN of the device
+            :type usn: str
+            :param max_age: Amount of time in seconds from now the device is considered available for
+            :type max_age: int
+            :return: True if the device was registered and has been refreshed
+            :rtype: bool
+        """
+
+        with self._lock:
+            entry = self._get_entry(usn)
+            if entry is None:
+                return False
+
+            self._devices[usn] = (entry[0], time.monotonic() + max_age)
+            return True
+
+    def remove(self, usn):
+
+        """
+            **Remove a device from the registry**
+
+            :param usn: USN of the device
+            :type usn: str
+            :return: The removed device or None if it wasn't registered
+            :rtype: SSDPDevice
+        """
+
+        with self._lock:
+            if usn not in self._devices:
+                return None
+            return self._delete(usn)
+
+    def get(self, usn):
+
+        """
+            **Get a registered device by its USN**
+
+            :param usn: USN of the device
+            :type usn: str
+            :return: The device or None if it isn't registered or its announcement expired
+            :rtype: SSDPDevice
+        """
+
+        with self._lock:
+            entry = self._get_entry(usn)
+
+        if entry is None:
+            return None
+        return entry[0]
+
+    def lookup(self, headers):
+
+        """
+            **Get the registered device an SSDP response refers to**
+
+            :param headers: Headers of a search response or ``ssdp:alive`` announcement
+            :type headers: upnpy.ssdp.SSDPResponse.SSDPHeaders
+            :return: The registered device with the response's USN (or location if it has none), or None if there is none or if the response
+                     announces a different location, ``BOOTID.UPNP.ORG`` or ``CONFIGID.UPNP.ORG``
+            :rtype: SSDPDevice
+        """
+
+        device = self.get(headers.get('usn') or headers.get('location'))
+
+        if device is None or _get_configuration(device.headers) != _get_configuration(headers):
+            return None
+        return device
+
+    def get_devices(self):
+
+        """
+            **Get all registered devices**
+
+            :return: List of the devices that are currently available
+            :rtype: list
+        """
+
+        with self._lock:
+            self._remove_expired()
+            return [device for device, _ in self._devices.values()]
+
+    def find(self, device_type=None, service_type=None, host=None, udn=None, friendly_name=None):
+
+        """
+            **Find registered devices**
+
+            Returns the devices matching all given criteria. Device and service types can be given as the full URN
+            (``urn:schemas-upnp-org:service:WANIPConnection:1``), the type name with its version
+            (``WANIPConnection:1``) or only the type name (``WANIPConnection``). A device registered under several
+            USNs, e.g. once for every search target it responded to, is only returned once.
+
+            :param device_type: Type of the root device
+            :type device_type: str
+            :param service_type: Type of a service of the device or one of its embedded devices
+            :type service_type: str
+            :param host: Address of the device
+            :type host: str
+            :param udn: Unique device name (``uuid:...``)
+            :type udn: str
+            :param friendly_name: Friendly name of the device
+            :type friendly_name: str
+            :return: List of the matching devices
+            :rtype: list
+        """
+
+        criteria = [
+            (index, key) for index, key in zip(_INDEXES, (device_type, service_type, host, udn, friendly_name))
+            if key is not None
+        ]
+
+        with self._lock:
+            if criteria:
+                # Start with the smallest index entry and check the USNs against the others
+                matches = sorted((self._indexes[index].get(key, {}) for index, key in criteria), key=len)
+                usns = [usn for usn in matches[0] if all(usn in match for match in matches[1:])]
+            else:
+                usns = list(self._devices)
+
+            devices = []
+            udns = set()
+
+            for usn in usns:
+                entry = self._get_entry(usn)
+                device_udn = usn.split('::', 1)[0]
+
+                if entry is not None and device_udn not in udns:
+                    udns.add(device_udn)
+                    devices.append(entry[0])
+
+        return devices
+
+    def find_services(self, service_type, **criteria):
+
+        """
+            **Find services of registered devices**
+
+            :param service_type: Type of the services as the full URN, the type name with its version or only the
+                                 type name
+            :type service_type: str
+            :param criteria: Further criteria for the devices, see :meth:`find`
+            :return: List of the matching services of all matching devices
+            :rtype: list
+        """
+
+        services = []
+
+        for device in self.find(service_type=service_type, **criteria):
+            for service in device.get_services():
+                if service_type in _get_type_keys(service.service):
+                    services.append(service)
+
+        return services
+
+    def get_changes(self):
+
+        """
+            **Get the devices that changed since the last call**
+
+            Devices that have been added and removed again in the meantime are left out, devices that have been
+            removed and added again are reported as changed.
+
+            :return: Named tuple of the lists of ``added``, ``removed`` and ``changed`` devices
+            :rtype: RegistryChanges
+        """
+
+        with self._lock:
+            self._remove_expired()
+
+            changes = RegistryChanges([], [], [])
+            for kind, device in self._changes.values():
+                getattr(changes, kind).append(device)
+
+            self._changes.clear()
+
+        return changes
+
+    def clear(self):
+
+        """
+            **Remove all devices from the registry**
+        """
+
+        with self._lock:
+            for usn in list(self._devices):
+                self._delete(usn)
+
+    def _record_change(self, usn, kind, device):
+
+        """
+        Record a change of the device with the given USN, combined with a change already recorded for it.
+        Must be called with the lock held.
+        """
+
+        previous_kind = self._changes.get(usn, (None, None))[0]
+
+        if kind == 'removed' and previous_kind == 'added':
+            del self._changes[usn]
+            return
+
+        if kind == 'added' and previous_kind == 'removed':
+            kind = 'changed'
+        elif kind == 'changed' and previous_kind == 'added':
+            kind = 'added'
+
+        self._changes[usn] = (kind, device)
+
+    def _get_entry(self, usn):
+
+        """
+        Get the entry for a USN and mark it as recently used, dropping it if it has expired. Must be called with
+        the lock held.
+        """
+
+        entry = self._devices.get(usn)
+        if entry is None:
+            return None
+
+        if entry[1] <= time.monotonic():
+            self._delete(usn)
+            return None
+
+        self._devices.move_to_end(usn)
+        return entry
+
+    def _remove_expired(self):
+        now = time.monotonic()
+
+        for usn in [usn for usn, (_, expires) in self._devices.items() if expires <= now]:
+            self._delete(usn)
+
+    def _delete(self, usn):
+
+        """
+        Remove a device along with its index entries and record its removal. Must be called with the lock held.
+        """
+
+        device, _ = self._devices.pop(usn)
+        self._unindex(usn, device)
+        self._record_change(usn, 'removed', device)
+        return device
+
+    def _index(self, usn, device):
+        for index, key in _get_index_keys(usn, device):
+            self._indexes[index][key][usn] = None
+
+    def _unindex(self, usn, device):
+        for index, key in _get_index_keys(usn, device):
+            usns = self._indexes[index].get(key)
+
+            if usns is not None:
+                usns.pop(usn, None)
+                if not usns:
+                    del self._indexes[index][key]
+
+    def __contains__(self, usn):
+        return self.get(usn) is not None
+
+    def __len__(self):
+        with self._lock:
+            self._remove_expired()
+            return len(self._devices)
+
+    def __iter__(self):
+        return iter(self.get_devices())
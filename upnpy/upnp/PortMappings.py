@@ -0,0 +1,124 @@
+import collections
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+
+from upnpy import exceptions
+import upnpy.utils as utils
+
+
+ADD = 'add'
+DELETE = 'delete'
+
+PortMappingResult = collections.namedtuple('PortMappingResult', ['operation', 'mapping', 'error'])
+
+_ACTION_NAMES = {ADD: 'AddPortMapping', DELETE: 'DeletePortMapping'}
+
+# Arguments identifying a port mapping on the IGD
+_MAPPING_KEY_ARGUMENTS = ('NewRemoteHost', 'NewExternalPort', 'NewProtocol')
+
+
+def apply_port_mappings(service, operations, max_concurrency=None):
+
+    """
+        **Apply a batch of port mapping changes**
+
+        Adds and deletes port mappings on a ``WANIPConnection`` or ``WANPPPConnection`` service. Operations on
+        different mappings are sent concurrently over the kept-alive connections of the connection pool, operations
+        on the same mapping (remote host, external port and protocol) are applied one after another in the given
+        order. A failing operation doesn't affect the others, its error is reported in its result instead.
+
+        :param service: The WANIPConnection or WANPPPConnection service of the IGD
+        :type service: SSDPDevice.Service
+        :param operations: List of ``(operation, mapping)`` tuples, where operation is ``ADD`` or ``DELETE`` and
+                           mapping a dictionary of the arguments of ``AddPortMapping`` (e.g.:
+                           ``{'NewExternalPort': 8080, 'NewProtocol': 'TCP', ...}``). Deletions only use the arguments
+                           ``DeletePortMapping`` takes, so the same mappings can be used to add and delete.
+        :type operations: list
+        :param max_concurrency: Maximum number of concurrent requests, defaults to the number of requests the request
+                                scheduler allows in flight per device
+        :type max_concurrency: int
+        :return: List of results in the order of the operations, their ``error`` is None if the operation succeeded,
+                 otherwise the ``SOAPError``, ``ArgumentError`` or ``URLError`` it failed with
+        :rtype: list
+    """
+
+    actions = {}
+
+    for operation, _ in operations:
+        if operation not in _ACTION_NAMES:
+            raise exceptions.ArgumentError(f'Unknown port mapping operation "{operation}".', operation)
+        if operation not in actions:
+            actions[operation] = getattr(service, _ACTION_NAMES[operation])
+
+    # Operations on the same mapping have to be applied in order, different mappings can be changed concurrently
+    mapping_operations = collections.OrderedDict()
+    for index, (_, mapping) in enumerate(operations):
+        key = tuple(str(mapping.get(argument, '')) for argument in _MAPPING_KEY_ARGUMENTS)
+        mapping_operations.setdefault(key, []).append(index)
+
+    results = [None] * len(operations)
+
+    def apply_mapping_operations(indexes):
+        for index in indexes:
+            operation, mapping = operations[index]
+            results[index] = _apply_operation(actions[operation], operation, mapping)
+
+    if max_concurrency is None:
+        max_concurrency = utils.get_request_scheduler().max_in_flight
+
+    with ThreadPoolExecutor(max(1, min(max_concurrency, len(mapping_operations)))) as executor:
+        list(executor.map(apply_mapping_operations, mapping_operations.values()))
+
+    return results
+
+
+def add_port_mappings(service, mappings, max_concurrency=None):
+
+    """
+        **Add a batch of port mappings**
+
+        See :func:`apply_port_mappings`.
+
+        :param service: The WANIPConnection or WANPPPConnection service of the IGD
+        :type service: SSDPDevice.Service
+        :param mappings: List of dictionaries of the arguments of ``AddPortMapping``
+        :type mappings: list
+        :param max_concurrency: Maximum number of concurrent requests
+        :type max_concurrency: int
+        :return: List of results in the order of the mappings
+        :rtype: list
+    """
+
+    return apply_port_mappings(service, [(ADD, mapping) for mapping in mappings], max_concurrency)
+
+
+def delete_port_mappings(service, mappings, max_concurrency=None):
+
+    """
+        **Delete a batch of port mappings**
+
+        See :func:`apply_port_mappings`.
+
+        :param service: The WANIPConnection or WANPPPConnection service of the IGD
+        :type service: SSDPDevice.Service
+        :param mappings: List of dictionaries with the ``NewRemoteHost``, ``NewExternalPort`` and ``NewProtocol`` of
+                         the mappings, further arguments are ignored
+        :type mappings: list
+        :param max_concurrency: Maximum number of concurrent requests
+        :type max_concurrency: int
+        :return: List of results in the order of the mappings
+        :rtype: list
+    """
+
+    return apply_port_mappings(service, [(DELETE, mapping) for mapping in mappings], max_concurrency)
+
+
+def _apply_operation(action, operation, mapping):
+    arguments = {argument.name: mapping[argument.name] for argument in action.args_in if argument.name in mapping}
+
+    try:
+        action(**arguments)
+    except (exceptions.SOAPError, exceptions.ArgumentError, urllib.error.URLError) as e:
+        return PortMappingResult(operation, mapping, e)
+
+    return PortMappingResult(operation, mapping, None)
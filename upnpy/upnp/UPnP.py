@@ -1,21 +1,43 @@
-from upnpy.ssdp.SSDPRequest import SSDPRequest
+from upnpy.ssdp.SSDPRequest import SSDPRequest, DEFAULT_MAX_WORKERS
+from upnpy.ssdp.SSDPListener import SSDPListener
+from upnpy.upnp.DeviceRegistry import DeviceRegistry
 from upnpy import exceptions
 import upnpy.utils as utils
 
 
+IGD_SEARCH_TARGETS = [
+    'urn:schemas-upnp-org:device:InternetGatewayDevice:1',
+    'urn:schemas-upnp-org:device:InternetGatewayDevice:2'
+]
+
+
+def _is_igd(device):
+    return utils.parse_device_type(device.type_) == 'InternetGatewayDevice'
+
+
 class UPnP:
 
     """
         **UPnP object**
 
         A UPnP object used for device discovery
+
+        Every discovered device is kept in :attr:`registry` until its announcement expires, so successive discoveries
+        are merged and only devices that are new or changed have to be introspected.
+
+        :param registry_size: Maximum number of devices to keep in the registry, unlimited if not set
+        :type registry_size: int
     """
 
-    def __init__(self):
+    def __init__(self, registry_size=None):
         self.ssdp = SSDPRequest()
         self.discovered_devices = []
+        self.registry = DeviceRegistry(registry_size)
+        self.listener = None
 
-    def discover(self, delay=2, **headers):
+    def discover(self, delay=2, max_workers=DEFAULT_MAX_WORKERS, lazy=False, cache=None, callback=None,
+                 max_devices=None, stop_when=None, st='upnp:rootdevice', filters=None, interfaces=None,
+                 ipv6=False, refresh=False, **headers):
 
         """
             **Find UPnP devices on the network**
@@ -24,35 +46,208 @@ class UPnP:
 
             :param delay: Discovery delay, amount of time in seconds to wait for a reply from devices
             :type delay: int
+            :param max_workers: Maximum number of device / service descriptions to retrieve concurrently, shared
+                                between the two (at least two, one of each, unless ``lazy`` is set)
+            :type max_workers: int
+            :param lazy: Only retrieve a service's description once its actions or state variables are accessed
+            :type lazy: bool
+            :param cache: Optional persistent cache so unchanged device and service descriptions aren't downloaded again
+            :type cache: upnpy.cache.DescriptionCache
+            :param callback: Optional function called with every device as soon as it has been discovered
+            :type callback: callable
+            :param max_devices: Stop the discovery once this many devices have been found
+            :type max_devices: int
+            :param stop_when: Stop the discovery as soon as a device for which this function returns True is found
+            :type stop_when: callable
+            :param st: Search target, or a list of search targets
+            :type st: str or list
+            :param filters: Functions from :mod:`upnpy.ssdp.SSDPFilters` (or any callable) evaluated on the raw
+                            SSDP response of every device before it is introspected, e.g.:
+                            ``functools.partial(SSDPFilters.subnet_filter, subnet='192.168.1.0/24')``
+            :type filters: list
+            :param interfaces: Addresses of the local interfaces to search on, or ``'all'`` to search on every
+                               interface at once. Discovered devices are tagged with the interface in their
+                               ``interface`` attribute. By default only the interface of the default route is used
+            :type interfaces: list or str
+            :param ipv6: Search on the IPv6 SSDP addresses (``FF02::C`` and ``FF05::C``) in parallel with IPv4,
+                         results of both are merged
+            :type ipv6: bool
+            :param refresh: Introspect every responding device again, even if it is registered with the same
+                            location, ``BOOTID.UPNP.ORG`` and ``CONFIGID.UPNP.ORG``
+            :type refresh: bool
             :param headers: Optional headers for the request
             :return: List of discovered devices
             :rtype: list
         """
 
-        discovered_devices = []
-        for device in self.ssdp.m_search(discover_delay=delay, st='upnp:rootdevice', **headers):
-            discovered_devices.append(device)
+        devices = self.discover_iter(
+            delay=delay,
+            max_workers=max_workers,
+            lazy=lazy,
+            cache=cache,
+            max_devices=max_devices,
+            stop_when=stop_when,
+            st=st,
+            filters=filters,
+            interfaces=interfaces,
+            ipv6=ipv6,
+            refresh=refresh,
+            **headers
+        )
+
+        for device in devices:
+            if callback is not None:
+                callback(device)
 
-        self.discovered_devices = discovered_devices
         return self.discovered_devices
 
-    def get_igd(self):
+    def discover_iter(self, delay=2, max_workers=DEFAULT_MAX_WORKERS, lazy=False, cache=None, max_devices=None,
+                      stop_when=None, st='upnp:rootdevice', filters=None, interfaces=None, ipv6=False,
+                      refresh=False, **headers):
+
+        """
+            **Find UPnP devices on the network as they respond**
+
+            Same as :meth:`discover`, but yields every device as soon as its response has arrived and its description
+            has been retrieved instead of waiting for the whole discovery delay. The discovery stops as soon as
+            iteration stops.
+
+            :param delay: Discovery delay, amount of time in seconds to wait for a reply from devices
+            :type delay: int
+            :param max_workers: Maximum number of device / service descriptions to retrieve concurrently, shared
+                                between the two (at least two, one of each, unless ``lazy`` is set)
+            :type max_workers: int
+            :param lazy: Only retrieve a service's description once its actions or state variables are accessed
+            :type lazy: bool
+            :param cache: Optional persistent cache so unchanged device and service descriptions aren't downloaded again
+            :type cache: upnpy.cache.DescriptionCache
+            :param max_devices: Stop the discovery once this many devices have been found
+            :type max_devices: int
+            :param stop_when: Stop the discovery as soon as a device for which this function returns True is found
+            :type stop_when: callable
+            :param st: Search target, or a list of search targets
+            :type st: str or list
+            :param filters: Functions from :mod:`upnpy.ssdp.SSDPFilters` (or any callable) evaluated on the raw
+                            SSDP response of every device before it is introspected, e.g.:
+                            ``functools.partial(SSDPFilters.subnet_filter, subnet='192.168.1.0/24')``
+            :type filters: list
+            :param interfaces: Addresses of the local interfaces to search on, or ``'all'`` to search on every
+                               interface at once. Discovered devices are tagged with the interface in their
+                               ``interface`` attribute. By default only the interface of the default route is used
+            :type interfaces: list or str
+            :param ipv6: Search on the IPv6 SSDP addresses (``FF02::C`` and ``FF05::C``) in parallel with IPv4,
+                         results of both are merged
+            :type ipv6: bool
+            :param refresh: Introspect every responding device again, even if it is registered with the same
+                            location, ``BOOTID.UPNP.ORG`` and ``CONFIGID.UPNP.ORG``
+            :type refresh: bool
+            :param headers: Optional headers for the request
+            :return: Generator yielding the discovered devices
+            :rtype: generator
+        """
+
+        self.discovered_devices = []
+
+        devices = self.ssdp.m_search(
+            discover_delay=delay,
+            st=st,
+            max_workers=max_workers,
+            lazy=lazy,
+            cache=cache,
+            filters=filters,
+            interfaces=interfaces,
+            ipv6=ipv6,
+            registry=None if refresh else self.registry,
+            **headers
+        )
+
+        try:
+            for device in devices:
+                self.discovered_devices.append(device)
+                self.registry.add(device)
+                yield device
+
+                if max_devices is not None and len(self.discovered_devices) >= max_devices:
+                    break
+                if stop_when is not None and stop_when(device):
+                    break
+        finally:
+            devices.close()
+
+    def listen(self, max_workers=DEFAULT_MAX_WORKERS, lazy=False, cache=None, filters=None, interfaces=None):
+
+        """
+            **Keep track of devices from their announcements**
+
+            Starts listening in the background for the ``ssdp:alive`` and ``ssdp:byebye`` announcements devices send
+            to the SSDP multicast address. Announced devices are added to :attr:`registry` as soon as they have been
+            introspected and removed once they leave the network or their announcement expires, so the registry can
+            be queried at any time without sending an M-SEARCH request.
+
+            :param max_workers: Maximum number of device / service descriptions to retrieve concurrently, shared
+                                between the two (at least two, one of each, unless ``lazy`` is set)
+            :type max_workers: int
+            :param lazy: Only retrieve a service's description once its actions or state variables are accessed
+            :type lazy: bool
+            :param cache: Optional persistent cache so unchanged device and service descriptions aren't downloaded again
+            :type cache: upnpy.cache.DescriptionCache
+            :param filters: Functions evaluated on every announcement before the device is introspected
+            :type filters: list
+            :param interfaces: Addresses of the local interfaces to listen on, or ``'all'`` to listen on every interface
+            :type interfaces: list or str
+            :return: The running listener, call its ``stop`` method to stop listening
+            :rtype: upnpy.ssdp.SSDPListener.SSDPListener
+        """
+
+        if self.listener is not None:
+            self.listener.stop()
+
+        self.listener = SSDPListener(
+            self.registry,
+            max_workers=max_workers,
+            lazy=lazy,
+            cache=cache,
+            filters=filters,
+            interfaces=interfaces,
+            ssdp_mcast_addr=self.ssdp.SSDP_MCAST_ADDR,
+            ssdp_port=self.ssdp.SSDP_PORT
+        )
+
+        return self.listener.start()
+
+    def get_igd(self, discover=False, delay=2, **discover_options):
 
         """
             **Get the Internet Gateway Device if available**
 
-            Gets the Internet Gateway device if it's available after discovery.
+            Gets the Internet Gateway device if it's available after discovery. It is selected from the devices found
+            by the last discovery. If nothing has been discovered, the devices in :attr:`registry` are used instead,
+            which includes the devices found by :meth:`listen`.
+
+            With ``discover=True`` a targeted M-SEARCH for Internet Gateway Devices is sent instead and the first IGD
+            is returned as soon as its description has been retrieved, without waiting for the discovery delay.
 
+            :param discover: Search for the IGD instead of selecting it from the previously discovered devices
+            :type discover: bool
+            :param delay: Discovery delay, amount of time in seconds to wait for the IGD to reply
+            :type delay: int
+            :param discover_options: Optional arguments for :meth:`discover_iter`
             :return: The IGD if successful or raises a upnpy.exceptions.IGDError exception upon failure
             :rtype: SSDPDevice
         """
 
-        ig_devices = []
+        if discover:
+            for device in self.discover_iter(delay=delay, st=IGD_SEARCH_TARGETS, **discover_options):
+                if _is_igd(device):
+                    return device
+
+            raise exceptions.IGDError('No IGD found.')
+
+        ig_devices = [device for device in self.discovered_devices if _is_igd(device)]
 
-        for device in self.discovered_devices:
-            device_type = utils.parse_device_type(device.type_)
-            if device_type == 'InternetGatewayDevice':
-                ig_devices.append(device)
+        # Without a discovery, e.g. when only listening for announcements, the IGD is looked up in the registry
+        if not self.discovered_devices:
+            ig_devices = self.registry.find(device_type='InternetGatewayDevice')
 
         if len(ig_devices) == 1:
             return ig_devices[0]
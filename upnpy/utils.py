@@ -1,4 +1,19 @@
-import urllib.request
+import re
+import socket
+import struct
+from xml.etree.ElementTree import XMLPullParser
+
+from upnpy.connection_pool import HTTPConnectionPool
+from upnpy.scheduler import RequestScheduler
+
+
+_connection_pool = HTTPConnectionPool()
+_request_scheduler = RequestScheduler()
+
+_MAX_AGE_PATTERN = re.compile(r'max-age\s*=\s*(\d+)', re.IGNORECASE)
+
+# Amount of XML data handed to the parser at a time
+_XML_CHUNK_SIZE = 16384
 
 
 def parse_device_type(device_type):
@@ -56,12 +71,158 @@ def parse_http_header(header, header_key):
             return ''.join(header[1::]).split()[0]
 
 
-def make_http_request(url, data=None, headers=None):
+def parse_max_age(cache_control):
+
+    """
+        **Parse the max-age directive of a CACHE-CONTROL header**
+
+        :param cache_control: Value of the CACHE-CONTROL header
+        :type cache_control: str
+        :return: The number of seconds the announcement is valid for or None if it isn't specified
+        :rtype: int
+    """
+
+    if cache_control is None:
+        return None
+
+    max_age = _MAX_AGE_PATTERN.search(cache_control)
+    if max_age is None:
+        return None
+    return int(max_age.group(1))
+
+
+def iterparse_xml(xml):
+
+    """
+        **Incrementally parse an XML document**
+
+        Feeds the document to the parser in chunks and yields the parser events as they become available, so callers
+        can stop as soon as they found what they need. Namespaces are stripped from the tag names.
+
+        :param xml: The XML document
+        :type xml: bytes or str
+        :return: Generator yielding ``(event, local tag name, element)`` tuples for every ``start`` and ``end`` event
+        :rtype: generator
+    """
+
+    parser = XMLPullParser(events=('start', 'end'))
+
+    for offset in range(0, len(xml), _XML_CHUNK_SIZE):
+        parser.feed(xml[offset:offset + _XML_CHUNK_SIZE])
+
+        for event, element in parser.read_events():
+            yield event, element.tag.rpartition('}')[2], element
+
+    parser.close()
+
+    for event, element in parser.read_events():
+        yield event, element.tag.rpartition('}')[2], element
+
+
+def get_local_ipv4_addresses():
+
+    """
+        **Get the IPv4 addresses of the local network interfaces**
+
+        Loopback addresses are left out since they can't be used for discovering devices on the network.
+
+        :return: List of local interface addresses
+        :rtype: list
+    """
+
+    addresses = set()
+
+    try:
+        for address_info in socket.getaddrinfo(socket.gethostname(), None, socket.AF_INET):
+            addresses.add(address_info[4][0])
+    except socket.gaierror:
+        pass
+
+    # Ask the kernel for the address of every interface where that's supported (Linux)
+    try:
+        import fcntl
+
+        for _, interface_name in socket.if_nameindex():
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as interface_socket:
+                try:
+                    interface_request = fcntl.ioctl(
+                        interface_socket.fileno(),
+                        0x8915,  # SIOCGIFADDR
+                        struct.pack('256s', interface_name.encode()[:15])
+                    )
+                except OSError:
+                    continue
+                addresses.add(socket.inet_ntoa(interface_request[20:24]))
+    except (ImportError, AttributeError, OSError):
+        pass
+
+    return sorted(address for address in addresses if not address.startswith('127.'))
+
+
+def get_connection_pool():
+
+    """
+        **Get the connection pool used for HTTP requests**
+
+        :return: The connection pool shared by device discovery and action invocation
+        :rtype: upnpy.connection_pool.HTTPConnectionPool
+    """
+
+    return _connection_pool
+
+
+def set_connection_pool(connection_pool):
+
+    """
+        **Replace the connection pool used for HTTP requests**
+
+        Allows configuring the maximum number of connections per device, the idle timeout and request timeouts.
+
+        :param connection_pool: The connection pool to use from now on
+        :type connection_pool: upnpy.connection_pool.HTTPConnectionPool
+    """
+
+    global _connection_pool
+
+    previous_connection_pool = _connection_pool
+    _connection_pool = connection_pool
+    previous_connection_pool.close()
+
+
+def get_request_scheduler():
+
+    """
+        **Get the scheduler SOAP requests are made through**
+
+        :return: The scheduler limiting the concurrent SOAP requests per device
+        :rtype: upnpy.scheduler.RequestScheduler
+    """
+
+    return _request_scheduler
+
+
+def set_request_scheduler(request_scheduler):
+
+    """
+        **Replace the scheduler SOAP requests are made through**
+
+        Allows configuring the maximum number of concurrent SOAP requests and the rate limit per device. Requests
+        already waiting for their turn are still scheduled by the previous scheduler.
+
+        :param request_scheduler: The scheduler to use from now on
+        :type request_scheduler: upnpy.scheduler.RequestScheduler
+    """
+
+    global _request_scheduler
+    _request_scheduler = request_scheduler
+
+
+def make_http_request(url, data=None, headers=None, method=None):
 
     """
         **Helper function for making HTTP requests**
 
-        Helper function for making HTTP requests using urllib.
+        Helper function for making HTTP requests over the shared keep-alive connection pool.
 
         :param url: The URL to which a request should be made
         :type url: str
@@ -69,13 +230,14 @@ def make_http_request(url, data=None, headers=None):
         :type data: str
         :param headers: Provide headers to send with the request
         :type headers: dict
-        :return: A urllib.Request.urlopen object
-        :rtype: urllib.Request.urlopen
+        :param method: Request method, e.g. ``SUBSCRIBE`` for GENA requests. Defaults to GET or POST
+        :type method: str
+        :return: The fully read response
+        :rtype: upnpy.connection_pool.HTTPResponse
     """
 
     if not headers:
         headers = {}
 
-    # If data is provided the request method will automatically be set to POST by urllib
-    request = urllib.request.Request(url, data=data, headers=headers)
-    return urllib.request.urlopen(request)
+    # If data is provided the request method will automatically be set to POST
+    return _connection_pool.request(url, data=data, headers=headers, method=method)